@@ -2,7 +2,15 @@ import pygame
 import numpy as np
 import random
 import collections
-import math
+import os
+import sys
+import time
+from cosmic_canvas import World, Planet, SpatialIndex, scenarios, recording
+from cosmic_canvas.render import Renderer
+from cosmic_canvas.simulation import Simulation, FRAME_RATE
+from cosmic_canvas.profiler import Profiler
+from cosmic_canvas.integrators import INTEGRATORS
+from cosmic_canvas.constants import DT, STAGES, RED_DWARF_MASS, STAR_MASS, RED_GIANT_MASS, BLUE_GIANT_MASS, CHANDRASEKHAR_LIMIT, BLACK_HOLE_MASS
 
 # Initialize Pygame
 pygame.init()
@@ -14,18 +22,9 @@ pygame.display.set_caption("Cosmic Canvas")
 clock = pygame.time.Clock()
 
 # Constants
-G = 0.05
-DT = 0.5
 THROW_MULTIPLIER = 0.2
-PHYSICS_SUB_STEPS = 5
-
-# --- Star stage mass thresholds ---
-RED_DWARF_MASS = 50000
-STAR_MASS = 200000
-RED_GIANT_MASS = 500000
-BLUE_GIANT_MASS = 800000
-CHANDRASEKHAR_LIMIT = 1400000
-BLACK_HOLE_MASS = 2000000
+SAVE_FILE = "cosmic_canvas_save.npz"
+PICK_SLACK, PICK_REACH = 5, 12  # pixels: a click this close to a disc picks it, or failing that, this close to a small body's centre
 
 # --- UI Classes ---
 class Button:
@@ -70,205 +69,207 @@ camera_zoom, camera_offset = 1.0, np.array([WIDTH / 2.0, HEIGHT / 2.0])
 is_panning, pan_start_pos = False, None
 
 # --- Coordinate Conversion Functions ---
+# One point or an (n, 2) array at a time
 def screen_to_world(screen_pos):
-    return (np.array(screen_pos) - np.array([WIDTH/2, HEIGHT/2])) / camera_zoom + camera_offset
-def world_to_screen(world_pos):
-    return (np.array(world_pos) - camera_offset) * camera_zoom + np.array([WIDTH/2, HEIGHT/2])
-
-# Planet class
-class Planet:
-    def __init__(self, x, y, vx, vy, mass, color=None, radius=None, stage="PLANET"):
-        self.pos, self.vel, self.mass = np.array([float(x), float(y)]), np.array([float(vx), float(vy)]), float(mass)
-        self.stage, self.color, self.trail = stage, color, []
-        self.radius = int(radius if radius is not None else (self.mass/1)**(1/3.0))
-        self.supernova_timer = 0
-        if self.color is None:
-            self.set_stage_color()
-
-    def set_stage_color(self):
-        if self.stage == "PLANET":
-            if self.color is None: # Only assign random color if no color exists
-                self.color = (random.randint(50, 255), random.randint(50, 255), random.randint(50, 255))
-        elif self.stage == "RED_DWARF": self.color = (255, 100, 50)
-        elif self.stage == "STAR": self.color = (255, 255, 200)
-        elif self.stage == "RED_GIANT": self.color = (255, 69, 0)
-        elif self.stage == "BLUE_GIANT": self.color = (170, 220, 255)
-        elif self.stage == "WHITE_DWARF": self.color = (240, 240, 255)
-        elif self.stage == "NEUTRON_STAR": self.color = (200, 220, 255)
-        elif self.stage == "BLACK_HOLE": self.color = (0, 0, 0)
-
-    def set_stage(self, new_stage):
-        self.stage = new_stage
-        self.set_stage_color()
-
-    def trigger_evolution_check(self):
-        if self.stage == "BLUE_GIANT" and self.mass >= BLACK_HOLE_MASS: self.go_supernova()
-        elif self.stage == "WHITE_DWARF" and self.mass >= CHANDRASEKHAR_LIMIT: self.go_supernova()
-        elif self.stage == "NEUTRON_STAR" and self.mass >= BLACK_HOLE_MASS: self.set_stage("BLACK_HOLE")
-        elif self.stage == "PLANET" and self.mass >= RED_DWARF_MASS: self.set_stage("RED_DWARF")
-        elif self.stage == "RED_DWARF" and self.mass >= STAR_MASS: self.set_stage("STAR")
-        elif self.stage == "STAR" and self.mass >= RED_GIANT_MASS: self.set_stage("RED_GIANT")
-        elif self.stage == "RED_GIANT" and self.mass >= BLUE_GIANT_MASS: self.set_stage("BLUE_GIANT")
-        
-    def go_supernova(self):
-        self.supernova_timer = 120
-        self.mass *= 0.8
-        if self.mass >= BLACK_HOLE_MASS:
-            self.set_stage("BLACK_HOLE")
-        else:
-            self.set_stage("NEUTRON_STAR")
-            self.radius = 10
-
-    def update(self, planets, dt):
-        if dragging_planet == self or self.supernova_timer > 0: return
-
-        total_force = np.array([0.0, 0.0])
-        for other in planets:
-            if other != self:
-                r_vec, r_mag = other.pos - self.pos, np.linalg.norm(other.pos - self.pos)
-                if self.stage == "BLACK_HOLE" and r_mag < self.radius:
-                    self.mass += other.mass; self.radius = int((self.mass / 1)**(1/3.0))
-                    if other in planets: planets.remove(other); continue
-                if r_mag > 0: total_force += (G * self.mass * other.mass / r_mag**3) * r_vec
-                if r_mag > 0 and r_mag < self.radius + other.radius:
-                    if self.mass >= other.mass and other in planets:
-                        new_mass = self.mass + other.mass
-                        self.radius = int((self.radius**3 + other.radius**3)**(1/3.0))
-                        self.vel = (self.vel * self.mass + other.vel * other.mass) / new_mass
-                        self.pos = (self.pos * self.mass + other.pos * other.mass) / new_mass
-                        self.mass = new_mass
-                        self.trigger_evolution_check()
-                        planets.remove(other)
-
-        self.vel += total_force / self.mass * dt
-        self.pos += self.vel * dt
-        self.trail.append(tuple(self.pos))
-        if len(self.trail) > 500: self.trail.pop(0)
-
-    def draw(self, screen, selected=False):
-        screen_pos = world_to_screen(self.pos).astype(int)
-        screen_radius = max(2, int(self.radius * camera_zoom))
+    return renderer.to_world(screen_pos, camera_offset, camera_zoom)
 
-        if self.supernova_timer > 0:
-            self.supernova_timer -= 1; progress = (120 - self.supernova_timer)/120
-            size = int(progress * 500 * camera_zoom); alpha = int((1 - progress**2) * 200)
-            if size>0 and alpha>0:
-                glow_surface = pygame.Surface((size*2, size*2), pygame.SRCALPHA)
-                pygame.draw.circle(glow_surface, (255,255,255,alpha), (size,size), size)
-                screen.blit(glow_surface, (screen_pos[0]-size, screen_pos[1]-size))
-        
-        if self.stage in ["RED_DWARF", "STAR", "RED_GIANT", "BLUE_GIANT", "WHITE_DWARF"]:
-            glow_map = {"RED_DWARF":1.5, "STAR":2.5, "RED_GIANT":3.5, "BLUE_GIANT":3.0, "WHITE_DWARF":2.0}
-            color_map = {"RED_DWARF":(255,100,50,80), "STAR":(255,255,200,50), "RED_GIANT":(255,69,0,70), "BLUE_GIANT":(170,220,255,70), "WHITE_DWARF":(240,240,255,40)}
-            if self.stage == "RED_GIANT": screen_radius = int(screen_radius * 2.0)
-            if self.stage == "BLUE_GIANT": screen_radius = int(screen_radius * 1.5)
-            glow_radius = int(screen_radius * glow_map.get(self.stage, 1.0))
-            glow_surface = pygame.Surface((glow_radius*2, glow_radius*2), pygame.SRCALPHA)
-            pygame.draw.circle(glow_surface, color_map[self.stage], (glow_radius, glow_radius), glow_radius)
-            screen.blit(glow_surface, (screen_pos[0]-glow_radius, screen_pos[1]-glow_radius))
-        elif self.stage == "BLACK_HOLE": pygame.draw.circle(screen, (255,165,0), screen_pos, screen_radius + 5, 3)
-        elif self.stage == "NEUTRON_STAR":
-            pulse = abs(math.sin(pygame.time.get_ticks() * 0.01)) * 4
-            pygame.draw.circle(screen, (200,220,255,150), screen_pos, screen_radius + int(pulse), 1)
-
-        if len(self.trail)>1:
-            trail_color = (138,43,226) if self.stage == "BLACK_HOLE" else self.color
-            pygame.draw.lines(screen, trail_color, False, [tuple(world_to_screen(p)) for p in self.trail], 1)
-        
-        pygame.draw.circle(screen, self.color, screen_pos, screen_radius)
-        if selected: pygame.draw.circle(screen, (255,255,255), screen_pos, screen_radius + 4, 2)
-
-def circular_velocity(m, d): return np.sqrt(G * m / d) if d > 0 else 0
-
-planets = []
+planets, renderer = World(), Renderer((WIDTH, HEIGHT))
+sim = Simulation(planets)  # steps planets on its own thread: change them through sim.submit / sim.call, draw sim.view()
+profiler, show_profiler = Profiler(), False  # the window's frame phases; sim.profiler has the simulation's
+renderer.profiler = profiler
 selected_planet, dragging_planet = None, None
+marked_planets, band_start = [], None  # rubber-band multi-selection, and where the band being dragged started
+index, index_view = None, None  # SpatialIndex over the positions of index_view, rebuilt when the view changes
 drag_positions = collections.deque(maxlen=10)
 font = pygame.font.SysFont('Arial', 24)
 button_font = pygame.font.SysFont('segoeuisymbol, dejavusans, arial', 22, bold=True)
 is_paused, menu_open, spawn_menu_active = False, False, False
 current_scenario, spawn_menu_buttons, spawn_menu_panel_rect, spawn_pos_world = "", [], None, None
+recorder = None
+replay, replay_frame, replay_speed, scrubbing = None, 0.0, 1.0, False
+timeline_rect = pygame.Rect(10, HEIGHT-20, WIDTH-20, 10)
 
 def load_scenario(name):
-    global planets, selected_planet, camera_zoom, camera_offset, dragging_planet, current_scenario
-    planets.clear(); selected_planet, dragging_planet = None, None
-    camera_zoom, camera_offset = 1.0, np.array([WIDTH/2.0, HEIGHT/2.0])
-    center_pos = [WIDTH/2.0, HEIGHT/2.0]; current_scenario = name
-    if name == "Playground": return
-    if name == "Dying Star":
-        camera_zoom=1.2; giant = Planet(center_pos[0]-100, center_pos[1], 0, 0.5, RED_GIANT_MASS, stage="RED_GIANT")
-        wd = Planet(center_pos[0]+250, center_pos[1], 0, -1.5, CHANDRASEKHAR_LIMIT*0.9, stage="WHITE_DWARF", radius=15); planets.extend([giant, wd])
-    elif name == "Solar System":
-        camera_zoom = 0.4; sun = Planet(center_pos[0], center_pos[1], 0, 0, 450000, stage="STAR"); planets.append(sun)
-        p_data = [(160,5,(169,169,169)), (220,10,(218,165,32)), (290,12,(0,191,255)), (380,8,(255,69,0)), (600,500,(210,180,140)), (800,300,(240,230,140)),(1000,100,(173,216,230)),(1150,90,(0,0,205))]
-        for i, (dist, mass, color) in enumerate(p_data):
-            angle=random.uniform(0,2*np.pi); vel=circular_velocity(sun.mass, dist)
-            px,py,vx,vy = center_pos[0]+dist*np.cos(angle),center_pos[1]+dist*np.sin(angle),-vel*np.sin(angle),vel*np.cos(angle)
-            planets.append(Planet(px,py,vx,vy,mass,color))
-    elif name == "Binary Star System":
-        camera_zoom=0.5; m1,m2 = 300000,200000; total_mass,dist = m1+m2,400
-        r1,r2 = dist*m2/total_mass, dist*m1/total_mass; vel_base = np.sqrt(G/(dist*total_mass)); v1,v2=m2*vel_base, m1*vel_base
-        planets.extend([Planet(center_pos[0]-r1, center_pos[1], 0, v1, m1, stage="STAR"), Planet(center_pos[0]+r2, center_pos[1], 0, -v2, m2, stage="STAR")])
-        p_data = [(700,500,(173,216,230)), (850,800,(144,238,144)), (1000,600,(218,112,214))]
-        for i, (dist_p, mass_p, color_p) in enumerate(p_data):
-            angle=(2*np.pi/len(p_data))*i; vel=circular_velocity(total_mass, dist_p)
-            px,py,vx,vy = center_pos[0]+dist_p*np.cos(angle), center_pos[1]+dist_p*np.sin(angle),-vel*np.sin(angle),vel*np.cos(angle)
-            planets.append(Planet(px,py,vx,vy,mass_p,color_p))
-    elif name == "Black Hole Center":
-        camera_zoom=0.6; bh=Planet(center_pos[0],center_pos[1],0,0,2000000,stage="BLACK_HOLE"); planets.append(bh)
-        p_data = [(200,300,(255,69,0)),(350,500,(221,160,221)),(500,400,(100,149,237)),(600,100,(240,230,140)),(750,800,(32,178,170))]
-        for i, (dist, mass, color) in enumerate(p_data):
-            angle=(2*np.pi/len(p_data))*i; vel=circular_velocity(bh.mass, dist)
-            px,py,vx,vy = center_pos[0]+dist*np.cos(angle),center_pos[1]+dist*np.sin(angle),-vel*np.sin(angle),vel*np.cos(angle)
-            planets.append(Planet(px,py,vx,vy,mass,color))
-    elif name == "Binary Black Holes":
-        camera_zoom=1.0; mass,distance = 2000000,400; orbital_v = np.sqrt((G*mass)/(2*distance))
-        planets.extend([Planet(center_pos[0]-distance/2,center_pos[1],0,orbital_v,mass,stage="BLACK_HOLE"), Planet(center_pos[0]+distance/2,center_pos[1],0,-orbital_v,mass,stage="BLACK_HOLE")])
-load_scenario("Solar System")
+    global selected_planet, camera_zoom, camera_offset, dragging_planet, current_scenario, replay, marked_planets
+    selected_planet, dragging_planet, replay, marked_planets = None, None, None, []
+    camera_offset = np.array([WIDTH/2.0, HEIGHT/2.0]); current_scenario = name
+    camera_zoom = sim.call(scenarios.load_scenario, planets, name, center=(WIDTH/2.0, HEIGHT/2.0))
+
+# --- Commands: edits of the bodies, run on the simulation thread between frames ---
+def hold(p): sim.held = p
+def drag(p, pos):
+    if sim.held is p: p.pos = pos
+def throw(p, vel):
+    if vel is not None: p.vel = vel
+    if sim.held is p: sim.held = None
+def delete(p):
+    if p in planets: planets.remove(p)
+def scale_mass(ps, grow_or_shrink):
+    for p in ps:
+        if p in planets: grow_or_shrink(p)
+def grow(p): p.mass*=1.1; p.radius=int((p.mass/1)**(1/3.0)); p.trigger_evolution_check()
+def shrink(p): p.mass*=0.9; p.radius=max(2,int((p.mass/1)**(1/3.0)))
+def edit(p, prop, new_val):
+    if prop=='mass': p.mass=new_val if new_val>0 else 1; p.radius=max(2,int((p.mass/1)**(1/3.0))); p.trigger_evolution_check()
+    elif prop=='pos_x': p.pos[0]=new_val
+    elif prop=='pos_y': p.pos[1]=new_val
+    elif prop=='vel_x': p.vel[0]=new_val
+    elif prop=='vel_y': p.vel[1]=new_val
+def fields(p): return [(p.stage.replace('_', ' '), "stage"), (f"{p.mass:.1f}","mass"), (f"{p.pos[0]:.1f}","pos_x"), (f"{p.pos[1]:.1f}","pos_y"), (f"{p.vel[0]:.2f}","vel_x"), (f"{p.vel[1]:.2f}","vel_y")]
+def spatial():
+    global index, index_view
+    if index_view is not view: index, index_view = SpatialIndex(view.rows["pos"], view.rows["radius"]), view
+    return index
+def pick(screen_pos):
+    # The first body under the cursor, as drawn: within PICK_SLACK pixels of its disc. Failing that the
+    # nearest body, if its centre is within PICK_REACH pixels, so tiny bodies are easy to grab.
+    grid, point = spatial(), screen_to_world(screen_pos)
+    hit = grid.at(point, PICK_SLACK / camera_zoom)
+    if len(hit): return view.planets[hit[0]]
+    near = grid.nearest(point)
+    if near >= 0 and np.hypot(*(view.rows["pos"][near] - point)) * camera_zoom <= PICK_REACH: return view.planets[near]
+    return None
+def band_select(a, b):
+    # Bodies whose centre is inside the band dragged from a to b (screen coordinates)
+    if abs(a[0] - b[0]) < 3 and abs(a[1] - b[1]) < 3: return []
+    return [view.planets[i] for i in spatial().in_rect(screen_to_world(a), screen_to_world(b))]
+
+# --- Save / Load, Recording and Replay ---
+def save_game(path=SAVE_FILE):
+    sim.call(recording.save_state, path, planets, camera={"offset": camera_offset.tolist(), "zoom": camera_zoom}, scenario=current_scenario)
+    pygame.display.set_caption(f"Cosmic Canvas - saved {path}")
+def load_game(path=SAVE_FILE):
+    global selected_planet, camera_zoom, camera_offset, dragging_planet, current_scenario, replay, marked_planets
+    if not os.path.exists(path): pygame.display.set_caption(f"Cosmic Canvas - no save file {path}"); return
+    selected_planet, dragging_planet, replay, marked_planets = None, None, None, []
+    header = sim.call(recording.load_state, path, planets); camera = header.get("camera") or {}
+    camera_offset = np.array(camera.get("offset", [WIDTH/2.0, HEIGHT/2.0]), dtype=float); camera_zoom = camera.get("zoom", 1.0)
+    current_scenario = header.get("scenario", ""); pygame.display.set_caption(f"Cosmic Canvas - loaded {path}")
+def unobserve(observer):
+    if observer in sim.observers: sim.observers.remove(observer)
+def toggle_recording():
+    global recorder
+    if recorder:
+        sim.call(unobserve, recorder.append); recorder.close()
+        pygame.display.set_caption(f"Cosmic Canvas - recorded {recorder.frames} frames to {recorder.path}"); recorder = None
+    else:
+        recorder = recording.TrajectoryWriter(recording.unused_path(time.strftime("recording_%Y%m%d_%H%M%S.traj")), meta={"scenario": current_scenario, "dt": DT})
+        sim.call(sim.observers.append, recorder.append)
+def check_observers():
+    # The simulation drops an observer that raises; for the recorder, say why it stopped
+    global recorder
+    while sim.dropped:
+        observer, error = sim.dropped.pop(0)
+        if recorder and observer == recorder.append:
+            try: recorder.close()
+            except OSError: pass
+            pygame.display.set_caption(f"Cosmic Canvas - recording stopped after {recorder.frames} frames: {error}"); recorder = None
+def start_replay(path):
+    # Bodies are not simulated while replaying; frames are drawn straight from the recording
+    global replay, replay_frame, replay_speed, current_scenario
+    load_scenario("Playground"); sim.call(planets.clear)
+    replay, replay_frame, replay_speed, current_scenario = recording.Trajectory(path), 0.0, 1.0, "Replay"
+def draw_timeline():
+    last = max(len(replay) - 1, 0); k = int(replay_frame)
+    pygame.draw.rect(screen, (60,60,60), timeline_rect, border_radius=5)
+    if last: pygame.draw.rect(screen, (150,150,150), (timeline_rect.x, timeline_rect.y, timeline_rect.w * k // last, timeline_rect.h), border_radius=5)
+    info = f"Replay  frame {k+1}/{len(replay)}  step {replay.step(k) if len(replay) else 0}  speed x{replay_speed:g}"
+    text = font.render(info, True, (180,180,180)); screen.blit(text, (10, HEIGHT-50))
+
+if len(sys.argv) > 1:
+    # python Cosmic_Canvas.py <save file or recording directory>
+    if os.path.isdir(sys.argv[1]): start_replay(sys.argv[1])
+    else: load_game(sys.argv[1])
+else: load_scenario("Solar System")
 
 pause_button = Button(WIDTH-110, 10, 100, 30, "Pause", button_font, (100,100,100), (150,150,150))
 hamburger_button = Button(10, 10, 40, 30, "☰", button_font, (100,100,100), (150,150,150))
-menu_panel_rect = pygame.Rect(10, 50, 200, 260)
-menu_buttons = [ Button(20, 60+40*i, 180, 30, name, button_font, (50,50,50),(80,80,80)) for i, name in enumerate(["Playground", "Solar System", "Binary Star System", "Black Hole Center", "Binary Black Holes", "Dying Star"])]
+menu_panel_rect = pygame.Rect(10, 50, 200, 300)
+menu_buttons = [ Button(20, 60+40*i, 180, 30, name, button_font, (50,50,50),(80,80,80)) for i, name in enumerate(["Playground", "Solar System", "Binary Star System", "Black Hole Center", "Binary Black Holes", "Dying Star", "Galaxy"])]
 input_boxes, last_selected_planet_for_boxes = [], None
 
 def draw_instructions(screen):
     inst_font = pygame.font.SysFont('Arial', 20)
-    lines = ["--- Playground Mode ---", "", "Controls:", "- Right-Click: Open spawn menu", "- Left-Click: Select Planet", "- Drag & Release: Throw Planet", "- Middle-Click Drag: Pan View", "- Mouse Wheel: Zoom View", "- Spacebar: Pause / Play", "- Delete: Delete Selected Planet", "", "Select a planet and pause to edit its properties." ]
+    lines = ["--- Playground Mode ---", "", "Controls:", "- Right-Click: Open spawn menu", "- Left-Click: Select Planet", "- Left-Drag on Empty Space: Select Many", "- Drag & Release: Throw Planet", "- Middle-Click Drag: Pan View", "- Mouse Wheel: Zoom View", "- Spacebar: Pause / Play", "- Delete: Delete Selected Planet", "- I: Cycle Integrator", "- F: Fast Forward", "- F3: Profiler", "- F5 / F9: Save / Load", "- R: Start / Stop Recording", "", "Select a planet and pause to edit its properties." ]
     for i, line in enumerate(lines):
         text_surf = inst_font.render(line, True, (180,180,180)); text_rect = text_surf.get_rect(center=(WIDTH/2, HEIGHT/2 - (len(lines)*25)/2 + i*25)); screen.blit(text_surf, text_rect)
 def draw_ui():
-    if selected_planet and not is_paused:
-        info = f"Type: {selected_planet.stage.replace('_', ' ').title()} | Mass: {selected_planet.mass:.1f}"
+    if recorder:
+        pygame.draw.circle(screen, (255,0,0), (WIDTH-130, 25), 8); text = font.render("REC", True, (255,0,0)); screen.blit(text, (WIDTH-190, 12))
+    if planets.integrator != "euler" and replay is None:
+        text = font.render(f"Integrator: {planets.integrator}", True, (180,180,180)); screen.blit(text, (10, HEIGHT-35))
+    if not sim.rate:
+        text = font.render("Fast Forward", True, (180,180,180)); screen.blit(text, (WIDTH-150, HEIGHT-35))
+    if selected_planet in view.planets and not is_paused:
+        i = view.planets.index(selected_planet)
+        info = f"Type: {STAGES[view.rows['stage'][i]].replace('_', ' ').title()} | Mass: {view.mass[i]:.1f}"
         text = font.render(info, True, (255,255,255)); screen.blit(text, (10,50))
+    elif marked_planets:
+        row_of = {p: i for i, p in enumerate(view.planets)}; rows = [row_of[p] for p in marked_planets if p in row_of]
+        info = f"Selected: {len(rows)} bodies | Total Mass: {view.mass[rows].sum():.1f} | Up / Down: Scale Mass, Delete: Remove"
+        text = font.render(info, True, (255,255,255)); screen.blit(text, (10,50))
+    if band_start:
+        x0, y0 = band_start; x1, y1 = mouse_pos
+        pygame.draw.rect(screen, (100,200,255), (min(x0,x1), min(y0,y1), abs(x1-x0), abs(y1-y0)), 1)
+    if show_profiler: draw_profiler()
     if is_paused:
         pause_font = pygame.font.SysFont('Arial', 72); pause_text = pause_font.render("PAUSED", True, (255,255,255)); text_rect = pause_text.get_rect(center=(WIDTH/2, HEIGHT/2)); screen.blit(pause_text, text_rect)
 
+prof_font = pygame.font.SysFont('consolas, dejavusansmono, monospace', 15)
+def draw_profiler():
+    # Rolling p50 / p99 per frame over the last few seconds: phases in ms, counters as counts
+    rows = [("", "p50", "p99", "")]
+    for title, prof in ((f"Simulation ({f'{sim.rate} fps' if sim.rate else 'flat out'})", sim.profiler), (f"Window ({clock.get_fps():.0f} fps)", profiler)):
+        rows.append((title, "", "", ""))
+        for name, (p50, p99) in prof.stats().items():
+            if name in prof.phases: rows.append((name, f"{p50*1000:.2f}", f"{p99*1000:.2f}", "ms"))
+            else: rows.append((name, f"{p50:.4g}", f"{p99:.4g}", ""))
+    panel = pygame.Surface((300, 18*len(rows) + 10), pygame.SRCALPHA); panel.fill((0,0,0,180))
+    for i, (name, p50, p99, unit) in enumerate(rows):
+        y = 5 + 18*i; panel.blit(prof_font.render(name, True, (200,255,200)), (8 if not p50 else 18, y))
+        for text, right in ((p50, 200), (p99, 260)):
+            surf = prof_font.render(text, True, (200,255,200)); panel.blit(surf, (right - surf.get_width(), y))
+        panel.blit(prof_font.render(unit, True, (200,255,200)), (266, y))
+    screen.blit(panel, (WIDTH-310, 50))
+
+sim.start()
 running = True
 while running:
-    clock.tick(60)
+    clock.tick(60); profiler.lap()
     mouse_pos = pygame.mouse.get_pos()
+    sim.paused = is_paused or replay is not None
+    view = sim.view(); check_observers(); profiler.lap("view")
     
     for btn in [pause_button, hamburger_button] + (menu_buttons if menu_open else []) + (spawn_menu_buttons if spawn_menu_active else []): btn.update_hover(mouse_pos)
 
     if is_paused and selected_planet and selected_planet is not last_selected_planet_for_boxes:
-        input_boxes = [InputBox(95, 10+35*i, 140, 30, font, text, prop) for i, (text, prop) in enumerate([ (selected_planet.stage.replace('_', ' '), "stage"), (f"{selected_planet.mass:.1f}","mass"), (f"{selected_planet.pos[0]:.1f}","pos_x"), (f"{selected_planet.pos[1]:.1f}","pos_y"), (f"{selected_planet.vel[0]:.2f}","vel_x"), (f"{selected_planet.vel[1]:.2f}","vel_y")])]
+        input_boxes = [InputBox(95, 10+35*i, 140, 30, font, text, prop) for i, (text, prop) in enumerate(sim.call(fields, selected_planet))]
         last_selected_planet_for_boxes = selected_planet
     elif not (is_paused and selected_planet): input_boxes.clear(); last_selected_planet_for_boxes = None
 
     for event in pygame.event.get():
         if event.type == pygame.QUIT: running = False
+        if replay is not None:
+            # Timeline scrubbing, and replay keys take over the editing ones
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and timeline_rect.collidepoint(event.pos): scrubbing = True; continue
+            if event.type == pygame.MOUSEBUTTONUP and event.button == 1: scrubbing = False
+            if event.type == pygame.KEYDOWN and event.key in (pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_DOWN, pygame.K_BACKSPACE, pygame.K_HOME, pygame.K_END):
+                last = max(len(replay) - 1, 0)
+                if event.key == pygame.K_LEFT: replay_frame = max(int(replay_frame) - 1, 0)
+                elif event.key == pygame.K_RIGHT: replay_frame = min(int(replay_frame) + 1, last)
+                elif event.key == pygame.K_UP: replay_speed = max(-64.0, min(replay_speed * 2, 64.0))
+                elif event.key == pygame.K_DOWN: replay_speed = replay_speed / 2 if abs(replay_speed) > 0.125 else replay_speed
+                elif event.key == pygame.K_BACKSPACE: replay_speed = -replay_speed
+                elif event.key == pygame.K_HOME: replay_frame = 0.0
+                elif event.key == pygame.K_END: replay_frame = float(last)
+                continue
         active_box_handled_key = False
         if is_paused and selected_planet:
             for box in input_boxes:
                 if box.is_active and event.type == pygame.KEYDOWN: active_box_handled_key = True
                 if box.handle_event(event) == 'enter':
                     try:
-                        prop, new_val = box.property_name, float(box.text)
-                        if prop=='mass': selected_planet.mass=new_val if new_val>0 else 1; selected_planet.radius=max(2,int((selected_planet.mass/1)**(1/3.0))); selected_planet.trigger_evolution_check()
-                        elif prop=='pos_x': selected_planet.pos[0]=new_val
-                        elif prop=='pos_y': selected_planet.pos[1]=new_val
-                        elif prop=='vel_x': selected_planet.vel[0]=new_val
-                        elif prop=='vel_y': selected_planet.vel[1]=new_val
+                        sim.call(edit, selected_planet, box.property_name, float(box.text))
                         last_selected_planet_for_boxes = None
                     except ValueError: last_selected_planet_for_boxes = None
         
@@ -282,7 +283,7 @@ while running:
             if clicked_button_text:
                 types = {"Planet":(random.uniform(200,800),None,"PLANET"), "Red Dwarf":(RED_DWARF_MASS,None,"RED_DWARF"), "Star":(STAR_MASS,None,"STAR"), "Red Giant":(RED_GIANT_MASS,None,"RED_GIANT"), "Blue Giant":(BLUE_GIANT_MASS,None,"BLUE_GIANT"), "White Dwarf":(CHANDRASEKHAR_LIMIT*0.8,None,"WHITE_DWARF"), "Neutron Star":(BLACK_HOLE_MASS*0.9,None,"NEUTRON_STAR"), "Black Hole":(BLACK_HOLE_MASS,None,"BLACK_HOLE")}
                 mass, color, stage = types.get(clicked_button_text); radius = 15 if stage=="WHITE_DWARF" else (10 if stage=="NEUTRON_STAR" else None)
-                planets.append(Planet(spawn_pos_world[0],spawn_pos_world[1],0,0,mass,color,stage=stage,radius=radius))
+                sim.submit(planets.append, Planet(spawn_pos_world[0],spawn_pos_world[1],0,0,mass,color,stage=stage,radius=radius))
                 spawn_menu_active = False
             elif event.type == pygame.MOUSEBUTTONDOWN: spawn_menu_active = False
         elif event.type == pygame.MOUSEBUTTONDOWN:
@@ -293,42 +294,52 @@ while running:
                 if not any(b.is_active for b in input_boxes):
                     if menu_open and not menu_panel_rect.collidepoint(mouse_pos): menu_open = False
                     else:
-                        selected_planet, dragging_planet = None, None
-                        for p in planets:
-                            if np.linalg.norm(world_to_screen(p.pos) - np.array(mouse_pos)) < p.radius*camera_zoom + 5:
-                                selected_planet, dragging_planet = p, p; drag_positions.clear(); drag_positions.append(mouse_pos); break
-            elif event.button==3:
+                        selected_planet = dragging_planet = pick(mouse_pos); marked_planets = []
+                        if dragging_planet: sim.submit(hold, dragging_planet); drag_positions.clear(); drag_positions.append(mouse_pos)
+                        else: band_start = mouse_pos
+            elif event.button==3 and replay is None:
                 spawn_menu_active, menu_open, spawn_pos_world = True, False, screen_to_world(event.pos)
                 mx, my = event.pos; spawn_menu_panel_rect = pygame.Rect(mx,my, 160, 290)
                 spawn_menu_buttons = [Button(mx+5, my+5+35*i, 150, 30, name, button_font, (50,50,50),(80,80,80)) for i, name in enumerate(["Planet", "Red Dwarf", "Star", "Red Giant", "Blue Giant", "White Dwarf", "Neutron Star", "Black Hole"])]
         elif event.type == pygame.MOUSEBUTTONUP:
             if event.button==1 and dragging_planet:
-                if len(drag_positions)>1: dragging_planet.vel = (screen_to_world(drag_positions[-1])-screen_to_world(drag_positions[0]))*THROW_MULTIPLIER*5
+                sim.submit(throw, dragging_planet, (screen_to_world(drag_positions[-1])-screen_to_world(drag_positions[0]))*THROW_MULTIPLIER*5 if len(drag_positions)>1 else None)
                 dragging_planet = None
+            elif event.button==1 and band_start: marked_planets = band_select(band_start, event.pos); band_start = None
             elif event.button==2: is_panning = False
         elif event.type == pygame.KEYDOWN and not active_box_handled_key:
             if event.key == pygame.K_SPACE: is_paused = not is_paused; pause_button.text = "Play" if is_paused else "Pause"
+            elif event.key == pygame.K_i: sim.submit(setattr, planets, "integrator", INTEGRATORS[(INTEGRATORS.index(planets.integrator)+1) % len(INTEGRATORS)])
+            elif event.key == pygame.K_f: sim.rate = None if sim.rate else FRAME_RATE
+            elif event.key == pygame.K_F3: show_profiler = not show_profiler
+            elif event.key == pygame.K_F5 and replay is None: save_game()
+            elif event.key == pygame.K_F9: load_game()
+            elif event.key == pygame.K_r and replay is None: toggle_recording()
             if selected_planet:
-                if event.key == pygame.K_DELETE: planets.remove(selected_planet); selected_planet = None
-                elif event.key == pygame.K_UP:
-                    selected_planet.mass*=1.1; selected_planet.radius=int((selected_planet.mass/1)**(1/3.0)); selected_planet.trigger_evolution_check(); last_selected_planet_for_boxes=None
-                elif event.key == pygame.K_DOWN:
-                    selected_planet.mass*=0.9; selected_planet.radius=max(2,int((selected_planet.mass/1)**(1/3.0))); last_selected_planet_for_boxes=None
+                if event.key == pygame.K_DELETE: sim.submit(delete, selected_planet); selected_planet = None
+                elif event.key == pygame.K_UP: sim.submit(grow, selected_planet); last_selected_planet_for_boxes=None
+                elif event.key == pygame.K_DOWN: sim.submit(shrink, selected_planet); last_selected_planet_for_boxes=None
+            elif marked_planets:
+                if event.key == pygame.K_DELETE: sim.submit(planets.discard, marked_planets); marked_planets = []
+                elif event.key == pygame.K_UP: sim.submit(scale_mass, marked_planets, grow)
+                elif event.key == pygame.K_DOWN: sim.submit(scale_mass, marked_planets, shrink)
 
     if is_panning: camera_offset += (pan_start_pos-np.array(mouse_pos))/camera_zoom; pan_start_pos=np.array(mouse_pos)
-    if dragging_planet: dragging_planet.pos=screen_to_world(mouse_pos); drag_positions.append(mouse_pos)
+    if dragging_planet: sim.submit(drag, dragging_planet, screen_to_world(mouse_pos)); drag_positions.append(mouse_pos)
     
-    if not is_paused:
-        sub_dt = DT / PHYSICS_SUB_STEPS
-        for _ in range(PHYSICS_SUB_STEPS):
-            for p in planets[:]:
-                try: p.update(planets, sub_dt)
-                except Exception:
-                    if p in planets: planets.remove(p)
+    if replay is not None:
+        replay.refresh(); last = max(len(replay) - 1, 0)
+        if scrubbing: replay_frame = float(round(min(max((mouse_pos[0] - timeline_rect.x) / timeline_rect.w, 0), 1) * last))
+        elif not is_paused: replay_frame = min(max(replay_frame + replay_speed, 0), last)
 
+    profiler.lap("events")
     screen.fill((0,0,0))
-    for p in planets: p.draw(screen, selected=p==selected_planet)
-    if current_scenario=="Playground" and not planets: draw_instructions(screen)
+    if replay is not None:
+        if len(replay): rows = replay.frame(int(replay_frame)); renderer.draw_rows(screen, rows, replay.stages(rows), camera_offset, camera_zoom)
+        draw_timeline()
+    else: renderer.draw_snapshot(screen, view, camera_offset, camera_zoom, selected=selected_planet, marked=marked_planets)
+    profiler.lap("draw")
+    if current_scenario=="Playground" and not view.planets: draw_instructions(screen)
     draw_ui()
     
     if menu_open: pygame.draw.rect(screen, (30, 30, 30), menu_panel_rect, border_radius=8)
@@ -336,7 +347,12 @@ while running:
         
     for btn in [pause_button, hamburger_button] + (menu_buttons if menu_open else []) + (spawn_menu_buttons if spawn_menu_active else []): btn.draw(screen)
     for box in input_boxes: box.draw(screen)
+    profiler.lap("ui")
         
     pygame.display.flip()
+    profiler.lap("flip"); profiler.record("drawn", renderer.drawn); profiler.record("culled", renderer.culled); profiler.record("trail points", renderer.trail_points)
+    profiler.end_frame(sprites=renderer.sprites.misses)
 
+sim.stop()
+if recorder: recorder.close()
 pygame.quit()
\ No newline at end of file
@@ -0,0 +1,33 @@
+# Barnes-Hut force evaluation against exact summation: time per evaluation and force error.
+# Run from the repository root: python -m benchmarks.bench_barnes_hut [N ...] [--theta 0.3,0.5,0.8]
+import argparse
+import time
+import numpy as np
+
+from cosmic_canvas import barnes_hut_accelerations, force_error
+from cosmic_canvas.world import gravity_accelerations
+
+def make_disk(n, seed=0, scale=3000.0):
+    rng = np.random.default_rng(seed)
+    r = scale * np.sqrt(rng.uniform(0.01, 1, n)); a = rng.uniform(0, 2 * np.pi, n)
+    return np.stack([r * np.cos(a), r * np.sin(a)], axis=1), rng.uniform(5, 40, n)
+
+def timed(fn, *args):
+    start = time.perf_counter(); fn(*args); return time.perf_counter() - start
+
+def exact_seconds(pos, mass, limit=10000):
+    # The exact kernel is too slow to time at 100k, so time it on at most `limit` bodies and scale by N^2
+    m = min(limit, len(pos))
+    return timed(gravity_accelerations, pos[:m], mass[:m]) * (len(pos) / m) ** 2
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("sizes", nargs="*", type=int, default=[10000, 100000])
+    parser.add_argument("--theta", default="0.3,0.5,0.8")
+    args = parser.parse_args()
+    print(f"{'N':>8} {'theta':>6} {'tree s':>8} {'exact s':>8} {'speedup':>8} {'median err':>11} {'p99 err':>9}")
+    for n in args.sizes:
+        pos, mass = make_disk(n); exact = exact_seconds(pos, mass)
+        for theta in (float(t) for t in args.theta.split(",")):
+            tree = timed(barnes_hut_accelerations, pos, mass, theta); err = force_error(pos, mass, theta, sample=500)
+            print(f"{n:>8} {theta:>6.2f} {tree:>8.3f} {exact:>8.3f} {exact / tree:>7.1f}x {err['median']:>11.2e} {err['p99']:>9.2e}")
@@ -0,0 +1,27 @@
+# Physics throughput of the array-backed World on random clouds.
+# Run from the repository root: python -m benchmarks.bench_physics
+import sys
+import time
+import numpy as np
+
+from cosmic_canvas import World, Planet, DT, PHYSICS_SUB_STEPS
+
+def make_cloud(n, seed=0, spread=5000.0, trail_length=0):
+    rng = np.random.default_rng(seed)
+    world = World(capacity=n, trail_length=trail_length)
+    pos = rng.uniform(-spread, spread, (n, 2)); vel = rng.normal(0, 0.5, (n, 2)); mass = rng.uniform(200, 800, n)
+    world.extend(Planet(x, y, vx, vy, m, color=(255, 255, 255)) for (x, y), (vx, vy), m in zip(pos, vel, mass))
+    return world
+
+def steps_per_second(world, min_time=1.0):
+    sub_dt, steps, start = DT / PHYSICS_SUB_STEPS, 0, time.perf_counter()
+    while time.perf_counter() - start < min_time or steps < 3:
+        world.step(sub_dt); steps += 1
+    return steps / (time.perf_counter() - start)
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [100, 1000, 5000]
+    print(f"{'N':>8} {'steps/s':>10} {'frames/s':>10}")
+    for n in sizes:
+        rate = steps_per_second(make_cloud(n))
+        print(f"{n:>8} {rate:>10.1f} {rate / PHYSICS_SUB_STEPS:>10.1f}")
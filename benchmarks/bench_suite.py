@@ -0,0 +1,130 @@
+# Reproducible benchmark suite: physics steps/s, render frames/s and peak memory for the scenario
+# presets and random clouds of increasing N, compared against a stored baseline.
+# Run from the repository root: python -m benchmarks.bench_suite [--sizes 100,1000,5000] [--save-baseline]
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy"); os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+import pygame
+
+from cosmic_canvas import World, DT, PHYSICS_SUB_STEPS, scenarios
+from cosmic_canvas.render import Renderer
+from cosmic_canvas.trails import TRAIL_LENGTH
+from benchmarks.bench_physics import make_cloud
+
+PRESETS = ("Solar System", "Binary Star System", "Black Hole Center", "Binary Black Holes", "Dying Star")
+SIZE = (1000, 800)   # the window's size
+SPREAD = 5000.0      # half-width of the random clouds
+STEPS = TRAIL_LENGTH # physics steps timed per case, after which trails are full length for the frames/s
+FRAMES = 30          # frames drawn per render measurement
+SMALL = 1000         # cases with fewer bodies time SMALL_WORK times the steps and frames: their steps take
+SMALL_WORK = 10      # well under a millisecond, and short runs of them are mostly timer and scheduler noise
+TOLERANCE = 0.25     # relative change counted as a regression; runs of the clouds of SMALL or more bodies agree within ~15%
+SMALL_TOLERANCE = 0.5 # for the smaller cases, which still drift by up to ~35% from one run to the next
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+# (metric, +1 if higher is better or -1 if lower is, floor): changes are relative to max(baseline, floor),
+# so a few hundred KB more on a tiny scenario does not count as a regression
+METRICS = (("steps_per_second", 1, 0.0), ("frames_per_second", 1, 0.0), ("peak_mb", -1, 1.0))
+
+def build(case, seed):
+    # A fresh world for a case, with the camera the window would use: (world, offset, zoom)
+    if case.startswith("cloud "):
+        return make_cloud(int(case.split()[1]), seed, SPREAD, TRAIL_LENGTH), np.zeros(2), SIZE[1] / (2 * SPREAD)
+    random.seed(seed); np.random.seed(seed)
+    world = World(); center = (SIZE[0] / 2, SIZE[1] / 2)
+    zoom = scenarios.load_scenario(world, case, center=center)
+    return world, np.array(center), zoom
+
+def steps_per_second(world, steps):
+    start = time.perf_counter()
+    for _ in range(steps): world.step(DT / PHYSICS_SUB_STEPS)
+    return steps / (time.perf_counter() - start)
+
+def frames_per_second(screen, renderer, world, offset, zoom, frames):
+    start = time.perf_counter()
+    for _ in range(frames): screen.fill((0, 0, 0)); renderer.draw(screen, world, offset, zoom); pygame.display.flip()
+    return frames / (time.perf_counter() - start)
+
+def run_case(case, screen, seed, steps, frames, repeat):
+    # Work is counted, not timed: `steps` physics steps from a fresh world, in `repeat` equal blocks,
+    # then `repeat` runs of `frames` frames of the state they reach, so every machine simulates and
+    # draws the same bodies and trails. Each speed is the median of its runs, which a single run
+    # slowed down by something else on the machine does not move.
+    world, offset, zoom = build(case, seed)
+    if len(world) < SMALL: steps, frames = steps * SMALL_WORK, frames * SMALL_WORK
+    block = max(steps // repeat, 1)
+    rate = float(np.median([steps_per_second(world, block) for _ in range(repeat)]))
+    renderer = Renderer(SIZE); renderer.draw(screen, world, offset, zoom)  # fill the sprite cache first
+    fps = float(np.median([frames_per_second(screen, renderer, world, offset, zoom, frames) for _ in range(repeat)]))
+    bodies = len(world)
+    # Peak memory in a separate pass, as tracing slows everything down: build, a frame of steps, a draw
+    tracemalloc.start()
+    world, offset, zoom = build(case, seed)
+    for _ in range(PHYSICS_SUB_STEPS): world.step(DT / PHYSICS_SUB_STEPS)
+    Renderer(SIZE).draw(screen, world, offset, zoom)
+    peak = tracemalloc.get_traced_memory()[1]; tracemalloc.stop()
+    return {"bodies": bodies, "steps_per_second": rate, "frames_per_second": fps, "peak_mb": peak / 2**20}
+
+def compare(results, baseline, tolerance, small_tolerance):
+    # Cases slower (or bigger) than the baseline by more than their tolerance, as (case, metric, change):
+    # `tolerance` for cases of at least SMALL bodies, `small_tolerance` for the others
+    regressions = []
+    for case, r in results.items():
+        base = baseline.get(case)
+        if base is None: continue
+        limit = tolerance if base["bodies"] >= SMALL else small_tolerance
+        for metric, better, floor in METRICS:
+            change = (r[metric] - base[metric]) / max(base[metric], floor, 1e-12)
+            r[metric + "_change"] = change
+            if change * better < -limit: regressions.append((case, metric, change))
+    return regressions
+
+def format_table(results):
+    lines = [f"{'case':<20} {'N':>6} {'steps/s':>10} {'':>7} {'frames/s':>10} {'':>7} {'peak MB':>8} {'':>7}"]
+    for case, r in results.items():
+        cells = [f"{r[metric]:>10.1f} {(format(r[metric + '_change'], '+.0%') if metric + '_change' in r else ''):>7}" for metric, _, _ in METRICS]
+        lines.append(f"{case:<20} {r['bodies']:>6} " + " ".join(cells))
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the presets and random clouds against a stored baseline.")
+    parser.add_argument("--sizes", default="100,1000,5000", help="body counts of the random clouds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--steps", type=int, default=STEPS, help="physics steps timed per case, from a fresh world (times SMALL_WORK for small cases)")
+    parser.add_argument("--frames", type=int, default=FRAMES, help="frames drawn per render measurement (times SMALL_WORK for small cases)")
+    parser.add_argument("--repeat", type=int, default=5, help="measurements per speed, the median counts")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline JSON to compare with (default benchmarks/baseline.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="write these results as the new baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="relative slowdown (or memory growth) counted as a regression")
+    parser.add_argument("--small-tolerance", type=float, default=SMALL_TOLERANCE, help=f"the same for cases of fewer than {SMALL} bodies")
+    parser.add_argument("--out", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    pygame.display.init(); screen = pygame.display.set_mode(SIZE)
+    cases = list(PRESETS) + [f"cloud {int(n)}" for n in args.sizes.split(",") if n]
+    results = {}
+    for case in cases:
+        results[case] = run_case(case, screen, args.seed, args.steps, args.frames, args.repeat)
+        print(f"{case}: {results[case]['steps_per_second']:.1f} steps/s, {results[case]['frames_per_second']:.1f} frames/s, {results[case]['peak_mb']:.1f} MB", file=sys.stderr)
+    meta = {"seed": args.seed, "python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(), "steps": args.steps, "frames": args.frames, "repeat": args.repeat}
+    if args.save_baseline:
+        with open(args.baseline, "w") as f: json.dump({**meta, "cases": results}, f, indent=1)
+        print(format_table(results)); print(f"Wrote baseline {args.baseline}")
+        sys.exit(0)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f: baseline = json.load(f)["cases"]
+    regressions = compare(results, baseline, args.tolerance, args.small_tolerance)
+    if args.out:
+        with open(args.out, "w") as f: json.dump({**meta, "cases": results, "regressions": regressions}, f, indent=1)
+    print(format_table(results))
+    if not baseline: print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+    for case, metric, change in regressions: print(f"REGRESSION {case}: {metric} {change:+.0%}")
+    sys.exit(1 if regressions else 0)
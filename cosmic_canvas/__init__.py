@@ -0,0 +1,5 @@
+from .constants import *
+from .world import SOLVERS, INTEGRATORS, BodyArrays, World, Planet, circular_velocity
+from .barnes_hut import QuadTree, barnes_hut_accelerations, force_error
+from .integrators import DriftMonitor, total_energy, momentum
+from .spatial import SpatialIndex
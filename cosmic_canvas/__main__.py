@@ -0,0 +1,80 @@
+import argparse
+import os
+import time
+
+from . import ensemble, headless
+from .scenarios import SCENARIOS, check_parameters
+from .world import INTEGRATORS, SOLVERS
+
+def count(text): return int(float(text))  # accepts 1e6 as well as 1000000
+
+def sweep(text):
+    # "m1=100000,200000" -> ("m1", [100000.0, 200000.0])
+    name, _, values = text.partition("=")
+    if not name or not values: raise argparse.ArgumentTypeError(f"expected NAME=V1,V2,... got {text!r}")
+    return name, [float(v) for v in values.split(",")]
+
+def setting(text):
+    # "bodies=1e5" -> ("bodies", 100000.0)
+    name, _, value = text.partition("=")
+    if not name or not value: raise argparse.ArgumentTypeError(f"expected NAME=V, got {text!r}")
+    return name, float(value)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m cosmic_canvas", description="Cosmic Canvas without the window.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="simulate one scenario headless")
+    run.add_argument("--scenario", required=True, choices=SCENARIOS)
+    run.add_argument("--steps", type=count, required=True, help="physics steps to simulate, e.g. 1e6")
+    run.add_argument("--out", help="write snapshots and the summary to this .npz file")
+    run.add_argument("--snapshot-every", type=count, default=1000, help="sub-steps between snapshots, 0 for start and end only")
+    run.add_argument("--seed", type=int, help="seed for the scenario's random placement")
+    run.add_argument("--set", type=setting, action="append", default=[], metavar="NAME=V", help="set a scenario parameter, e.g. bodies=1e5 for Galaxy (repeatable)")
+    run.add_argument("--solver", choices=SOLVERS, help="override the scenario's gravity solver")
+    run.add_argument("--theta", type=float, help="Barnes-Hut opening angle")
+    run.add_argument("--integrator", choices=INTEGRATORS, help="time integration scheme (default euler)")
+    run.add_argument("--sub-steps", type=count, help="physics steps per frame, i.e. the step is DT / sub-steps (default depends on the integrator)")
+    run.add_argument("--monitor-every", type=count, default=0, help="steps between energy/momentum drift samples, 0 to skip (costs an O(N^2) sum each)")
+    run.add_argument("--record", metavar="DIR", help="record a trajectory to this directory, replayable with python Cosmic_Canvas.py DIR")
+    run.add_argument("--record-every", type=count, default=0, help="steps between recorded frames (default one per frame)")
+    run.add_argument("--profile", metavar="PATH", help="time every phase of every frame and write the metrics to PATH (.csv: one row per frame, else JSON with a summary)")
+    run.add_argument("--quiet", action="store_true", help="only print the final summary")
+    ens = commands.add_parser("ensemble", help="run many seeded variants of a scenario across CPU cores")
+    ens.add_argument("--scenario", required=True, choices=SCENARIOS)
+    ens.add_argument("--steps", type=count, required=True, help="physics sub-steps per run")
+    ens.add_argument("--runs", type=count, default=10, help="seeded runs per parameter combination")
+    ens.add_argument("--set", type=sweep, action="append", default=[], metavar="NAME=V1,V2", help="sweep a scenario parameter, e.g. m1=2e5,3e5 (repeat for a grid)")
+    ens.add_argument("--seed", type=int, default=0, help="base seed the per-run seeds are derived from")
+    ens.add_argument("--processes", type=int, help="worker processes (default: one per CPU)")
+    ens.add_argument("--solver", choices=SOLVERS)
+    ens.add_argument("--theta", type=float)
+    ens.add_argument("--integrator", choices=INTEGRATORS)
+    ens.add_argument("--out", help="write one CSV row per run to this file")
+    ens.add_argument("--quiet", action="store_true", help="only print the aggregated table")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        try: check_parameters(args.scenario, dict(args.set))
+        except ValueError as e: parser.error(str(e))
+        if args.record and os.path.exists(args.record): parser.error(f"--record {args.record} already exists, pick a new directory")
+        world, summary, snapshots = headless.run(args.scenario, args.steps, args.snapshot_every, args.seed, args.solver, args.theta, log=None if args.quiet else print,
+                                                 integrator=args.integrator, sub_steps=args.sub_steps, monitor_every=args.monitor_every, record=args.record, record_every=args.record_every, profile=bool(args.profile), params=dict(args.set))
+        if args.out: headless.save(args.out, summary, snapshots)
+        print(headless.format_summary(summary))
+        if args.out: print(f"Wrote {len(snapshots)} snapshots to {args.out}")
+        if args.record: print(f"Recorded a trajectory to {args.record}")
+        if args.profile: world.profiler.write(args.profile, **{k: v for k, v in summary.items() if k != "profile"}); print(f"Wrote per-frame metrics to {args.profile}")
+    elif args.command == "ensemble":
+        try: tasks = ensemble.make_tasks(args.scenario, args.steps, args.runs, dict(args.set), args.seed, args.solver, args.theta, args.integrator)
+        except ValueError as e: parser.error(str(e))
+        summaries, start = [], time.perf_counter()
+        for s in ensemble.run_ensemble(tasks, args.processes):
+            summaries.append(s)
+            if not args.quiet: print(f"[{len(summaries)}/{len(tasks)}] run {s['run']} {ensemble.params_text(s['params'])} seed {s['seed']}: survival {s['survival_time']:.1f}, merges {s['merges']}, bodies {s['bodies_end']}")
+        wall = time.perf_counter() - start
+        print(ensemble.format_table(ensemble.aggregate(summaries)))
+        print(f"{len(tasks)} runs in {wall:.2f}s ({len(tasks) / wall:.2f} runs/s)")
+        if args.out: ensemble.write_csv(args.out, summaries); print(f"Wrote {args.out}")
+
+if __name__ == "__main__":
+    main()
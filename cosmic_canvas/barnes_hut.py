@@ -0,0 +1,138 @@
+import numpy as np
+
+from .constants import G
+
+THETA = 0.5      # opening angle: a node of side s at distance r is used as one mass when roughly s / r < theta
+LEVELS = 16      # quadtree depth limit; Morton keys use 2 bits per level
+LEAF_SIZE = 16   # nodes holding at most this many bodies are not subdivided further
+CHUNK = 4096     # target bodies handled per tree walk, bounds the size of the frontier arrays
+
+def _spread_bits(v):
+    v = v & 0xFFFF
+    v = (v | (v << 8)) & 0x00FF00FF
+    v = (v | (v << 4)) & 0x0F0F0F0F
+    v = (v | (v << 2)) & 0x33333333
+    return (v | (v << 1)) & 0x55555555
+
+def _compact_bits(v):
+    v = v & 0x55555555
+    v = (v | (v >> 1)) & 0x33333333
+    v = (v | (v >> 2)) & 0x0F0F0F0F
+    v = (v | (v >> 4)) & 0x00FF00FF
+    return (v | (v >> 8)) & 0xFFFF
+
+def expand_ranges(starts, counts):
+    # Concatenation of arange(s, s + c) for every (s, c), plus the row each entry came from
+    rows = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+    return rows, starts[rows] + offsets
+
+# --- Quadtree built level by level over Morton-sorted bodies ---
+class QuadTree:
+    def __init__(self, pos, mass, leaf_size=LEAF_SIZE):
+        lo = pos.min(axis=0); side = max(float((pos.max(axis=0) - lo).max()), 1e-9) * (1 + 1e-9)
+        cells = 1 << LEVELS
+        q = np.minimum(((pos - lo) / side * cells).astype(np.int64), cells - 1)
+        keys = _spread_bits(q[:, 0]) | (_spread_bits(q[:, 1]) << 1)
+        self.order = np.argsort(keys, kind="stable"); keys = keys[self.order]
+        self.pos, self.mass = pos[self.order], mass[self.order]
+        # Prefix sums turn every node's mass and centre of mass into two lookups
+        rel = self.pos - lo
+        cm = np.concatenate([[0.0], np.cumsum(self.mass)])
+        cmx = np.vstack([[0.0, 0.0], np.cumsum(self.mass[:, None] * rel, axis=0)])
+
+        n = len(keys); starts, ends, levels, child_lo, child_hi = [], [], [], [], []
+        s, e, offset = np.array([0]), np.array([n]), 0
+        for level in range(LEVELS + 1):
+            starts.append(s); ends.append(e); levels.append(np.full(len(s), level))
+            internal = (e - s > leaf_size) if level < LEVELS else np.zeros(len(s), dtype=bool)
+            lo_idx, hi_idx = np.full(len(s), -1), np.full(len(s), -1)
+            child_lo.append(lo_idx); child_hi.append(hi_idx)
+            offset += len(s)
+            if not internal.any(): break
+            # Split each internal node's body range wherever the next two key bits change
+            prefix = keys >> (2 * (LEVELS - level - 1))
+            cuts = np.flatnonzero(prefix[1:] != prefix[:-1]) + 1
+            bounds = np.unique(np.concatenate([s[internal], e[internal], cuts]))
+            cs, ce = bounds[:-1], bounds[1:]
+            parent = np.searchsorted(s, cs, side="right") - 1
+            keep = internal[parent] & (ce <= e[parent])
+            cs, ce, parent = cs[keep], ce[keep], parent[keep]
+            lo_idx[internal] = offset + np.searchsorted(parent, np.flatnonzero(internal), side="left")
+            hi_idx[internal] = offset + np.searchsorted(parent, np.flatnonzero(internal), side="right")
+            s, e = cs, ce
+
+        self.start, self.end = np.concatenate(starts), np.concatenate(ends)
+        self.child_lo, self.child_hi = np.concatenate(child_lo), np.concatenate(child_hi)
+        self.leaf = self.child_lo < 0
+        level = np.concatenate(levels); self.size = side / 2.0 ** level
+        self.node_mass = cm[self.end] - cm[self.start]
+        com = cmx[self.end] - cmx[self.start]
+        np.divide(com, self.node_mass[:, None], out=com, where=self.node_mass[:, None] > 0)
+        self.com = com + lo
+        # Opening distance per node (Barnes' b_max rule): size / theta plus how far the centre of
+        # mass sits from the cell centre, so lopsided cells are opened earlier
+        cell = keys[np.minimum(self.start, n - 1)] >> (2 * (LEVELS - level))
+        centre = lo + (np.stack([_compact_bits(cell), _compact_bits(cell >> 1)], axis=1) + 0.5) * self.size[:, None]
+        self.offset = np.linalg.norm(self.com - centre, axis=1)
+
+    def accelerations(self, theta=THETA, chunk=CHUNK):
+        # Leaves double as groups of target bodies that walk the tree together: the frontier holds
+        # (group, node) pairs, and a node is used as one mass for the whole group only when it is
+        # far enough from the group's bounding box. Each pass accepts, sums a leaf directly or opens.
+        n = len(self.pos); acc_sorted = np.zeros((n, 2)); self.interactions = 0  # body-node and body-body terms summed
+        open_r2 = (self.size / max(theta, 1e-12) + self.offset) ** 2
+        X, Y, M, CX, CY = self.pos[:, 0].copy(), self.pos[:, 1].copy(), self.mass, self.com[:, 0].copy(), self.com[:, 1].copy()
+        leaves = np.flatnonzero(self.leaf); leaves = leaves[np.argsort(self.start[leaves])]
+        gs, ge = self.start[leaves], self.end[leaves]
+        gmin, gmax = np.minimum.reduceat(self.pos, gs), np.maximum.reduceat(self.pos, gs)
+        per_chunk = max(1, chunk * len(leaves) // max(n, 1))
+        for g0 in range(0, len(leaves), per_chunk):
+            g1 = min(g0 + per_chunk, len(leaves)); c0, c1 = gs[g0], ge[g1 - 1]
+            group = np.arange(g0, g1); node = np.zeros(len(group), dtype=np.int64)
+            ax, ay = np.zeros(c1 - c0), np.zeros(c1 - c0)
+            while len(group):
+                com = self.com[node]
+                gap = np.maximum(gmin[group] - com, 0) + np.maximum(com - gmax[group], 0)
+                overlap = (self.start[node] < ge[group]) & (gs[group] < self.end[node])
+                far = ~overlap & (open_r2[node] < (gap * gap).sum(axis=1))
+                if far.any():
+                    rows, b = expand_ranges(gs[group[far]], ge[group[far]] - gs[group[far]]); nd = node[far][rows]
+                    dx, dy = CX[nd] - X[b], CY[nd] - Y[b]; r2 = dx * dx + dy * dy; self.interactions += len(b)
+                    w = G * self.node_mass[nd] / (r2 * np.sqrt(r2))
+                    ax += np.bincount(b - c0, w * dx, minlength=c1 - c0); ay += np.bincount(b - c0, w * dy, minlength=c1 - c0)
+                near_leaf = ~far & self.leaf[node]
+                if near_leaf.any():
+                    rows, b = expand_ranges(gs[group[near_leaf]], ge[group[near_leaf]] - gs[group[near_leaf]]); nd = node[near_leaf][rows]
+                    rows, j = expand_ranges(self.start[nd], self.end[nd] - self.start[nd]); b = b[rows]
+                    dx, dy = X[j] - X[b], Y[j] - Y[b]; r2 = dx * dx + dy * dy; self.interactions += len(b)
+                    w = np.divide(G * M[j], r2 * np.sqrt(r2), out=np.zeros_like(r2), where=r2 > 0)
+                    ax += np.bincount(b - c0, w * dx, minlength=c1 - c0); ay += np.bincount(b - c0, w * dy, minlength=c1 - c0)
+                opened = ~far & ~self.leaf[node]
+                g, nd = group[opened], node[opened]
+                rows, node = expand_ranges(self.child_lo[nd], self.child_hi[nd] - self.child_lo[nd]); group = g[rows]
+            acc_sorted[c0:c1, 0], acc_sorted[c0:c1, 1] = ax, ay
+        acc = np.empty((n, 2)); acc[self.order] = acc_sorted
+        return acc
+
+def barnes_hut_accelerations(pos, mass, theta=THETA):
+    if len(pos) == 0: return np.zeros((0, 2))
+    return QuadTree(pos, mass).accelerations(theta)
+
+def direct_accelerations(targets, pos, mass, tile_pairs=32768):
+    # Exact accelerations at selected body indices, for checking the tree against
+    out = np.empty((len(targets), 2)); tile = max(1, tile_pairs // max(len(pos), 1))
+    for a in range(0, len(targets), tile):
+        d = pos[None, :, :] - pos[targets[a:a + tile], None, :]; r2 = (d * d).sum(axis=2)
+        w = np.divide(G * mass, r2 * np.sqrt(r2), out=np.zeros_like(r2), where=r2 > 0)
+        out[a:a + tile] = np.einsum("ij,ijk->ik", w, d)
+    return out
+
+def force_error(pos, mass, theta=THETA, sample=1000, seed=0):
+    # Relative error of the tree against exact summation on a random sample of bodies
+    rng = np.random.default_rng(seed)
+    targets = np.sort(rng.choice(len(pos), size=min(sample, len(pos)), replace=False))
+    approx = barnes_hut_accelerations(pos, mass, theta)[targets]
+    exact = direct_accelerations(targets, pos, mass)
+    err = np.linalg.norm(approx - exact, axis=1) / np.maximum(np.linalg.norm(exact, axis=1), 1e-300)
+    return {"theta": theta, "sample": len(targets), "median": float(np.median(err)), "p99": float(np.percentile(err, 99)), "max": float(err.max())}
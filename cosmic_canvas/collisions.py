@@ -0,0 +1,93 @@
+import numpy as np
+
+from .barnes_hut import expand_ranges
+from .constants import STAGE_CODES
+
+BLACK_HOLE = STAGE_CODES["BLACK_HOLE"]
+GRID_PERCENTILE = 99  # bodies up to this radius percentile are hashed; the few larger ones query the grid instead
+BRUTE_FORCE_MAX = 64  # below this many bodies building the grid costs more than testing every pair
+
+# --- Broad phase: uniform spatial hash ---
+def contact_pairs(pos, radius):
+    # Every pair (i < j) whose discs overlap, with its separation, sorted by (i, j).
+    # Small bodies go into a grid of cells one small diameter wide, so a small body only needs the
+    # 3x3 cells around it. A large body (a black hole among dust) scans the block of cells its own
+    # radius reaches, and large bodies are tested against each other directly.
+    n = len(pos); pairs, dists = [], []
+    if n < 2: return np.zeros((0, 2), dtype=int), np.zeros(0)
+    if n <= BRUTE_FORCE_MAX:
+        i, j = np.triu_indices(n, 1); _narrow(pos, radius, i, j, pairs, dists)
+        return (pairs[0], dists[0]) if pairs else (np.zeros((0, 2), dtype=int), np.zeros(0))
+    r_cap = max(float(np.percentile(radius, GRID_PERCENTILE)), 0.5); cell = 2 * r_cap
+    small = radius <= r_cap
+    g = np.floor(pos / cell).astype(np.int64); g -= g.min(axis=0)
+    reach = np.ceil((radius + r_cap) / cell).astype(np.int64); w = int(reach.max())
+    rows_per_col = int(g[:, 1].max()) + 2 * w + 1
+    key = g[:, 0] * rows_per_col + g[:, 1] + w
+    members = np.flatnonzero(small); members = members[np.argsort(key[members], kind="stable")]
+    sorted_keys = key[members]
+
+    # One query per (body, grid column) covering the cells within the body's reach
+    body, dcol = expand_ranges(-reach, 2 * reach + 1)
+    centre = key[body] + dcol * rows_per_col
+    lo = np.searchsorted(sorted_keys, centre - reach[body], side="left")
+    hi = np.searchsorted(sorted_keys, centre + reach[body], side="right")
+    rows, k = expand_ranges(lo, hi - lo)
+    i, j = body[rows], members[k]
+    # Small-small pairs are seen from both sides, keep one; large bodies only ever see small ones
+    want = (i != j) & (~small[i] | (i < j))
+    _narrow(pos, radius, i[want], j[want], pairs, dists)
+
+    big = np.flatnonzero(~small)
+    if len(big) > 1:
+        a, b = np.triu_indices(len(big), 1)
+        _narrow(pos, radius, big[a], big[b], pairs, dists)
+    if not pairs: return np.zeros((0, 2), dtype=int), np.zeros(0)
+    pairs, dists = np.concatenate(pairs), np.concatenate(dists)
+    pairs.sort(axis=1)
+    order = np.lexsort((pairs[:, 1], pairs[:, 0]))
+    return pairs[order], dists[order]
+
+def _narrow(pos, radius, i, j, pairs, dists):
+    d = pos[j] - pos[i]; r2 = (d * d).sum(axis=1)
+    hit = r2 < (radius[i] + radius[j]) ** 2
+    if hit.any(): pairs.append(np.stack([i[hit], j[hit]], axis=1)); dists.append(np.sqrt(r2[hit]))
+
+def merge_contacts(found):
+    # Union of several contact_pairs() results, sorted by (i, j) again; a pair seen more than once
+    # keeps its smallest separation
+    found = [(p, d) for p, d in found if len(p)]
+    if not found: return np.zeros((0, 2), dtype=int), np.zeros(0)
+    if len(found) == 1: return found[0]
+    pairs, dists = np.concatenate([p for p, _ in found]), np.concatenate([d for _, d in found])
+    order = np.lexsort((dists, pairs[:, 1], pairs[:, 0])); pairs, dists = pairs[order], dists[order]
+    first = np.ones(len(pairs), dtype=bool); first[1:] = (pairs[1:] != pairs[:-1]).any(axis=1)
+    return pairs[first], dists[first]
+
+# --- Resolution: captures and mergers applied as one batch ---
+def resolve_contacts(world, pairs, dists, active, keep):
+    # Pairs are applied in (i, j) order so the outcome never depends on how they were found.
+    # Absorbed bodies are only marked in `keep`; the caller removes them with one compaction.
+    b = world.bodies
+    for (i, j), r in zip(pairs.tolist(), dists.tolist()):
+        if not (keep[i] and keep[j]): continue
+        # Black holes swallow anything inside their radius
+        eater = next((s for s in (i, j) if active[s] and b.stage[s] == BLACK_HOLE and r < b.radius[s]), None)
+        if eater is not None:
+            prey = j if eater == i else i
+            b.mass[eater] += b.mass[prey]; b.radius[eater] = int((b.mass[eater] / 1)**(1/3.0)); keep[prey] = False
+            world.events["captures"] += 1
+            continue
+        if r <= 0: continue
+        survivor = next((s for s, o in ((i, j), (j, i)) if active[s] and b.mass[s] >= b.mass[o]), None)
+        if survivor is None: continue
+        other = j if survivor == i else i
+        m1, m2 = b.mass[survivor], b.mass[other]; new_mass = m1 + m2
+        b.radius[survivor] = int((int(b.radius[survivor])**3 + int(b.radius[other])**3)**(1/3.0))
+        b.vel[survivor] = (b.vel[survivor] * m1 + b.vel[other] * m2) / new_mass
+        b.pos[survivor] = (b.pos[survivor] * m1 + b.pos[other] * m2) / new_mass
+        b.mass[survivor] = new_mass
+        world.planets[survivor].trigger_evolution_check()
+        keep[other] = False
+        world.events["merges"] += 1
+        if b.supernova_timer[survivor]: world.events["supernovae"] += 1
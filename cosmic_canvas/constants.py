@@ -0,0 +1,16 @@
+# Physics
+G = 0.05
+DT = 0.5
+PHYSICS_SUB_STEPS = 5
+
+# --- Star stage mass thresholds ---
+RED_DWARF_MASS = 50000
+STAR_MASS = 200000
+RED_GIANT_MASS = 500000
+BLUE_GIANT_MASS = 800000
+CHANDRASEKHAR_LIMIT = 1400000
+BLACK_HOLE_MASS = 2000000
+
+# Stage names in the order of their integer codes in BodyArrays.stage
+STAGES = ("PLANET", "RED_DWARF", "STAR", "RED_GIANT", "BLUE_GIANT", "WHITE_DWARF", "NEUTRON_STAR", "BLACK_HOLE")
+STAGE_CODES = {name: code for code, name in enumerate(STAGES)}
@@ -0,0 +1,86 @@
+import collections
+import csv
+import itertools
+import multiprocessing
+import os
+import numpy as np
+
+from . import headless
+from .scenarios import check_parameters
+
+# Workers run one BLAS thread each: the pool already fills every core, nested BLAS threads would only oversubscribe it
+WORKER_ENV = {"OMP_NUM_THREADS": "1", "OPENBLAS_NUM_THREADS": "1", "MKL_NUM_THREADS": "1"}
+
+# --- Building the run list ---
+def variants(grid):
+    # {"m1": [1, 2], "m2": [3]} -> [{"m1": 1, "m2": 3}, {"m1": 2, "m2": 3}]
+    keys = sorted(grid or {})
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+def make_tasks(scenario, steps, runs=1, grid=None, base_seed=0, solver=None, theta=None, integrator=None):
+    # `runs` seeded repeats of every parameter combination. Seeds come from one SeedSequence, so the
+    # whole ensemble is reproducible from base_seed and no two runs share a random stream. Unknown
+    # parameter names raise ValueError here, before any worker starts.
+    check_parameters(scenario, grid or {})
+    combos = variants(grid)
+    seeds = np.random.SeedSequence(base_seed).generate_state(len(combos) * runs)
+    return [{"run": k, "scenario": scenario, "steps": steps, "seed": int(seeds[k]), "params": params, "solver": solver, "theta": theta, "integrator": integrator}
+            for k, (params, _) in enumerate(itertools.product(combos, range(runs)))]
+
+def simulate(task):
+    _, summary, _ = headless.run(task["scenario"], task["steps"], seed=task["seed"], solver=task["solver"], theta=task["theta"], params=task["params"], integrator=task["integrator"])
+    summary["run"] = task["run"]
+    return summary
+
+# --- Running ---
+def run_ensemble(tasks, processes=None):
+    # Yields each run's summary as soon as it finishes (in completion order). Runs are independent,
+    # so they are handed to the pool one at a time and every core stays busy until the queue drains.
+    if processes == 1 or len(tasks) <= 1:
+        yield from map(simulate, tasks); return
+    # Spawned (not forked) workers import NumPy fresh, so they pick up WORKER_ENV
+    saved = {k: os.environ.get(k) for k in WORKER_ENV}
+    os.environ.update(WORKER_ENV)
+    try: pool = multiprocessing.get_context("spawn").Pool(processes)
+    finally:
+        for k, v in saved.items():
+            if v is None: os.environ.pop(k, None)
+            else: os.environ[k] = v
+    with pool:
+        yield from pool.imap_unordered(simulate, tasks)
+
+# --- Aggregation ---
+def aggregate(summaries):
+    # One row per parameter combination: mean survival time, mergers and final stage mix over its runs
+    groups = collections.defaultdict(list)
+    for s in summaries: groups[tuple(sorted(s["params"].items()))].append(s)
+    rows = []
+    for key in sorted(groups):
+        runs = groups[key]; stages = collections.Counter()
+        for s in runs: stages.update(s["final_stages"])
+        rows.append({"params": dict(key), "runs": len(runs),
+                     "survival_time": float(np.mean([s["survival_time"] for s in runs])),
+                     "survival_time_min": float(min(s["survival_time"] for s in runs)),
+                     "merges": float(np.mean([s["merges"] for s in runs])), "captures": float(np.mean([s["captures"] for s in runs])),
+                     "supernovae": float(np.mean([s["supernovae"] for s in runs])), "bodies_end": float(np.mean([s["bodies_end"] for s in runs])),
+                     "final_stages": {stage: count / len(runs) for stage, count in sorted(stages.items())}})
+    return rows
+
+def params_text(params): return " ".join(f"{k}={v:g}" for k, v in params.items()) or "(defaults)"
+
+def format_table(rows):
+    lines = [f"{'variant':<28} {'runs':>5} {'survival':>9} {'min surv':>9} {'merges':>7} {'captures':>8} {'supernovae':>10} {'bodies':>7}  final stages (mean per run)"]
+    for r in rows:
+        stages = ", ".join(f"{name.replace('_', ' ').title()} {count:.2f}" for name, count in r["final_stages"].items())
+        lines.append(f"{params_text(r['params']):<28} {r['runs']:>5} {r['survival_time']:>9.1f} {r['survival_time_min']:>9.1f} {r['merges']:>7.2f} {r['captures']:>8.2f} {r['supernovae']:>10.2f} {r['bodies_end']:>7.2f}  {stages}")
+    return "\n".join(lines)
+
+def write_csv(path, summaries):
+    # One line per run, parameters and final stage counts spread into their own columns
+    summaries = sorted(summaries, key=lambda s: s["run"])
+    params = sorted({k for s in summaries for k in s["params"]}); stages = sorted({k for s in summaries for k in s["final_stages"]})
+    fields = ["run", "seed"] + params + ["steps", "simulated_time", "survival_time", "merges", "captures", "supernovae", "bodies_start", "bodies_end", "wall_seconds"]
+    with open(path, "w", newline="") as f:
+        out = csv.writer(f); out.writerow(fields + [f"stage_{s.lower()}" for s in stages])
+        for s in summaries:
+            out.writerow([s["params"].get(f, s.get(f)) for f in fields] + [s["final_stages"].get(st, 0) for st in stages])
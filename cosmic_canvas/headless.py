@@ -0,0 +1,103 @@
+import collections
+import json
+import random
+import time
+import numpy as np
+
+from .constants import DT, STAGES
+from .integrators import SUB_STEPS, DriftMonitor
+from .profiler import Profiler
+from .recording import TrajectoryWriter
+from .scenarios import load_scenario
+from .world import World
+
+# --- Snapshots: every recorded frame's rows concatenated, with offsets into them ---
+class Snapshots:
+    FIELDS = ("pos", "vel", "mass", "radius", "stage")
+
+    def __init__(self):
+        self.steps, self.counts, self.rows = [], [], {name: [] for name in self.FIELDS}
+
+    def __len__(self): return len(self.steps)
+
+    def record(self, step, world):
+        b, n = world.bodies, world.bodies.n
+        self.steps.append(step); self.counts.append(n)
+        for name in self.FIELDS: self.rows[name].append(getattr(b, name)[:n].copy())
+
+    def arrays(self):
+        out = {"snapshot_step": np.array(self.steps, dtype=np.int64), "snapshot_start": np.concatenate([[0], np.cumsum(self.counts)]).astype(np.int64)}
+        for name in self.FIELDS: out[name] = np.concatenate(self.rows[name]) if self.rows[name] else np.zeros(0)
+        return out
+
+def stage_counts(world):
+    return dict(collections.Counter(p.stage for p in world))
+
+def run(scenario, steps, snapshot_every=0, seed=None, solver=None, theta=None, log=None, params=None, integrator=None, sub_steps=None, monitor_every=0, record=None, record_every=0, profile=False):
+    # Steps a scenario without any rendering. `steps` counts physics steps of DT / sub_steps (by default
+    # the integrator's own SUB_STEPS), and every sub_steps of them make one frame, which is what the
+    # supernova countdown runs on. monitor_every > 0 samples energy and momentum drift that often.
+    # record writes a trajectory directory for replay in the window, a frame every record_every steps
+    # (default once per frame). profile=True times every phase of every frame into world.profiler,
+    # for export with its write(), and adds per-frame percentiles to the summary.
+    if seed is not None: random.seed(seed); np.random.seed(seed)
+    world = World(trail_length=0); load_scenario(world, scenario, **(params or {}))
+    if solver is not None: world.solver = solver
+    if theta is not None: world.theta = theta
+    if integrator is not None: world.integrator = integrator
+    if profile: world.profiler = Profiler(keep=True)
+    prof = world.profiler
+    sub_steps = sub_steps or SUB_STEPS.get(world.integrator, 1)
+    sub_dt, bodies_start, snapshots, monitor = DT / sub_steps, len(world), Snapshots(), DriftMonitor(world)
+    recorder = TrajectoryWriter(record, meta={"scenario": scenario, "seed": seed, "dt": sub_dt}) if record else None
+    record_every = record_every or sub_steps
+    snapshots.record(0, world); start, first_loss = time.perf_counter(), None
+    if recorder: recorder.append(0, world)
+    if monitor_every: monitor.sample()
+    for step in range(1, steps + 1):
+        with prof.phase("step"): world.step(sub_dt)
+        if first_loss is None and len(world) < bodies_start: first_loss = step
+        if step % sub_steps == 0:
+            world.tick(); prof.record("bodies", len(world))
+            prof.end_frame(pairs=world.pair_interactions, merges=world.events["merges"], captures=world.events["captures"], supernovae=world.events["supernovae"])
+        if monitor_every and step % monitor_every == 0: monitor.sample()
+        if recorder and step % record_every == 0: recorder.append(step, world)
+        if snapshot_every and step % snapshot_every == 0:
+            snapshots.record(step, world)
+            if log: log(f"step {step}/{steps}  bodies {len(world)}  {step / (time.perf_counter() - start):.0f} steps/s")
+    wall = time.perf_counter() - start
+    if recorder: recorder.close()
+    if snapshots.steps[-1] != steps: snapshots.record(steps, world)
+    # Survival time: how long the starting system stayed intact, i.e. until its first merger or capture
+    summary = {"scenario": scenario, "params": dict(params or {}), "seed": seed, "solver": world.solver, "integrator": world.integrator,
+               "steps": steps, "sub_steps": sub_steps, "simulated_time": steps * sub_dt,
+               "survival_time": (first_loss if first_loss is not None else steps) * sub_dt,
+               "wall_seconds": wall, "steps_per_second": steps / wall if wall > 0 else float("inf"),
+               "force_evaluations": world.force_evaluations, "energy_drift": monitor.energy_drift if monitor.samples else None,
+               "momentum_drift": monitor.momentum_drift if monitor.samples else None,
+               "bodies_start": bodies_start, "bodies_end": len(world), "merges": world.events["merges"],
+               "captures": world.events["captures"], "supernovae": world.events["supernovae"], "final_stages": stage_counts(world)}
+    if profile: summary["profile"] = prof.summary()
+    return world, summary, snapshots
+
+def save(path, summary, snapshots):
+    np.savez_compressed(path, summary=json.dumps(summary), stage_names=np.array(STAGES), **snapshots.arrays())
+
+def format_summary(summary):
+    stages = ", ".join(f"{name.replace('_', ' ').title()}: {count}" for name, count in sorted(summary["final_stages"].items())) or "none"
+    return "\n".join([
+        f"{summary['scenario']}: {summary['steps']} steps ({summary['simulated_time']:.1f} time units) in {summary['wall_seconds']:.2f}s, {summary['steps_per_second']:.0f} steps/s",
+        f"Integrator: {summary['integrator']}, {summary['force_evaluations'] / max(summary['simulated_time'], 1e-300):.0f} force evaluations per time unit"
+        + (f", energy drift {summary['energy_drift']:.2e}, momentum drift {summary['momentum_drift']:.2e}" if summary["energy_drift"] is not None else ""),
+        f"Bodies: {summary['bodies_start']} -> {summary['bodies_end']}",
+        f"Merges: {summary['merges']}  Black hole captures: {summary['captures']}  Supernovae: {summary['supernovae']}",
+        f"Final stages: {stages}"] + ([format_profile(summary["profile"])] if "profile" in summary else []))
+
+def format_profile(profile):
+    # Per-frame p50 / p99 of every profiled phase (ms) and counter
+    width = max(map(len, profile), default=0)
+    lines = [f"{'per frame':<{width}}      p50      p99"]
+    for name, m in profile.items():
+        scale, unit = (1000, " ms") if m["unit"] == "s" else (1, "")
+        lines.append(f"{name:<{width}} {m['p50'] * scale:8.4g} {m['p99'] * scale:8.4g}{unit}")
+    return "\n".join(lines)
@@ -0,0 +1,123 @@
+import numpy as np
+
+from .constants import G, PHYSICS_SUB_STEPS
+
+INTEGRATORS = ("euler", "leapfrog", "rk4", "adaptive")
+# Physics steps per frame of DT each scheme is meant to run at. The adaptive one subdivides a whole
+# frame itself, only for the bodies that need it.
+SUB_STEPS = {"euler": PHYSICS_SUB_STEPS, "leapfrog": PHYSICS_SUB_STEPS, "rk4": PHYSICS_SUB_STEPS, "adaptive": 1}
+ETA = 0.025     # block timestep accuracy: a body's step is at most sqrt(2 * ETA * radius / |a|)
+MAX_LEVEL = 10  # finest block step is dt / 2**MAX_LEVEL
+CONTACT_LEVEL = 3  # the adaptive scheme looks for contacts 2**CONTACT_LEVEL times per dt, more often than PHYSICS_SUB_STEPS
+
+# Every integrator advances the active rows of world.bodies by dt in place. Inactive rows (dragged
+# or mid-supernova) keep their position and velocity but still pull on the others. An integrator
+# that moves bodies through several positions within dt may return the contacts it saw on the way,
+# as a list of world.contacts() results, for step() to resolve with those at the end.
+
+def euler(world, active, dt):
+    # Semi-implicit Euler, the original scheme: first order, one force evaluation per step
+    b = world.bodies; n = b.n; pos, vel = b.pos[:n], b.vel[:n]
+    acc = world.accelerations()
+    vel[active] += acc[active] * dt
+    pos[active] += vel[active] * dt
+
+def leapfrog(world, active, dt):
+    # Kick-drift-kick velocity Verlet: second order and time-reversible, so energy errors oscillate
+    # instead of accumulating. The closing force evaluation is cached and opens the next step.
+    b = world.bodies; n = b.n; pos, vel = b.pos[:n], b.vel[:n]
+    acc = world.accelerations()
+    vel[active] += acc[active] * (dt / 2)
+    pos[active] += vel[active] * dt
+    acc = world.accelerations()
+    vel[active] += acc[active] * (dt / 2)
+
+def rk4(world, active, dt):
+    # Classical fourth-order Runge-Kutta: very accurate per step for four force evaluations, but not
+    # symplectic, so over long runs energy drifts slowly in one direction
+    b = world.bodies; n = b.n; x0, v0 = b.pos[:n].copy(), b.vel[:n].copy()
+    moving = active[:, None]
+    def derivative(x, v): return np.where(moving, v, 0.0), np.where(moving, world.accelerations(x), 0.0)
+    k1x, k1v = derivative(x0, v0)
+    k2x, k2v = derivative(x0 + k1x * (dt / 2), v0 + k1v * (dt / 2))
+    k3x, k3v = derivative(x0 + k2x * (dt / 2), v0 + k2v * (dt / 2))
+    k4x, k4v = derivative(x0 + k3x * dt, v0 + k3v * dt)
+    b.pos[:n] = x0 + (k1x + 2 * k2x + 2 * k3x + k4x) * (dt / 6)
+    b.vel[:n] = v0 + (k1v + 2 * k2v + 2 * k3v + k4v) * (dt / 6)
+
+def block_levels(acc, radius, dt):
+    # Level k means steps of dt / 2**k; each body gets the coarsest level its acceleration allows
+    a = np.sqrt((acc * acc).sum(axis=1))
+    allowed = np.sqrt(2 * ETA * np.maximum(radius, 1) / np.maximum(a, 1e-300))
+    return np.clip(np.ceil(np.log2(np.maximum(dt / allowed, 1))), 0, MAX_LEVEL).astype(int)
+
+def adaptive(world, active, dt):
+    # Leapfrog with hierarchical block timesteps: every body drifts on the finest tick, but only
+    # bodies whose own step ends on a tick get their force re-evaluated and kicked. A close pair
+    # takes hundreds of small steps while the rest of the system takes one. Contacts are looked for
+    # every dt / 2**CONTACT_LEVEL on the way, as one collision phase per dt would let fast bodies
+    # pass through each other; the extra ticks only drift, they cost no force evaluations.
+    b = world.bodies; n = b.n; pos, vel = b.pos[:n], b.vel[:n]
+    acc = world.accelerations().copy()
+    level = block_levels(acc, b.radius[:n], dt); level[~active] = 0
+    top = max(int(level.max()), CONTACT_LEVEL); ticks = 1 << top; h = dt / ticks
+    stride = 1 << (top - level); half = (stride * (h / 2))[:, None]
+    check, contacts = 1 << (top - CONTACT_LEVEL), []
+    for t in range(ticks):
+        opening = active & (t % stride == 0)
+        vel[opening] += acc[opening] * half[opening]
+        pos[active] += vel[active] * h
+        closing = np.flatnonzero(active & ((t + 1) % stride == 0))
+        acc[closing] = world.accelerations(targets=closing)
+        vel[closing] += acc[closing] * half[closing]
+        if (t + 1) % check == 0 and t + 1 < ticks: contacts.append(world.contacts())
+    return contacts
+
+SCHEMES = {"euler": euler, "leapfrog": leapfrog, "rk4": rk4, "adaptive": adaptive}
+
+# --- Conservation diagnostics ---
+def kinetic_energy(world):
+    b = world.bodies; n = b.n
+    return float(0.5 * (b.mass[:n] * (b.vel[:n] ** 2).sum(axis=1)).sum())
+
+def potential_energy(pos, mass, tile_pairs=32768):
+    # -G * sum over pairs of m_i m_j / r_ij, in row tiles like the force kernel
+    n = len(pos); total, tile = 0.0, max(8, tile_pairs // max(n, 1))
+    for a in range(0, n, tile):
+        d = pos[a:a + tile, None, :] - pos[None, :, :]; r = np.sqrt((d * d).sum(axis=2))
+        inv = np.divide(1.0, r, out=np.zeros_like(r), where=r > 0)
+        total += float(mass[a:a + tile] @ inv @ mass)
+    return -0.5 * G * total
+
+def total_energy(world):
+    b = world.bodies; n = b.n
+    return kinetic_energy(world) + potential_energy(b.pos[:n], b.mass[:n])
+
+def momentum(world):
+    b = world.bodies; n = b.n
+    return (b.mass[:n, None] * b.vel[:n]).sum(axis=0)
+
+class DriftMonitor:
+    # Relative energy and momentum error of the integration. Mergers, captures, supernovae and
+    # dragged bodies change the totals for real, so each of those ends the current segment and the
+    # next sample starts a new one; the worst error over all segments is kept.
+    def __init__(self, world):
+        self.world, self.samples, self._base = world, 0, None
+        self.energy_error = self.energy_drift = self.momentum_drift = 0.0
+
+    def reset(self): self._base = None
+
+    def sample(self, held=None):
+        w = self.world; b = w.bodies
+        if held in w or b.supernova_timer[:b.n].any(): self._base = None; return
+        key = (len(w), w.events["merges"], w.events["captures"], w.events["supernovae"])
+        e, p = total_energy(w), momentum(w)
+        if self._base is None or self._base[0] != key:
+            # Momentum error is measured against the total |m v|, as the net momentum is often ~0
+            scale = float((b.mass[:b.n] * np.sqrt((b.vel[:b.n] ** 2).sum(axis=1))).sum())
+            self._base = (key, e, p, scale); return
+        _, e0, p0, scale = self._base
+        self.energy_error = abs(e - e0) / max(abs(e0), 1e-300)
+        self.energy_drift = max(self.energy_drift, self.energy_error)
+        self.momentum_drift = max(self.momentum_drift, float(np.linalg.norm(p - p0)) / max(scale, 1e-300))
+        self.samples += 1
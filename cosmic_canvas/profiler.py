@@ -0,0 +1,94 @@
+import collections
+import csv
+import json
+import time
+import numpy as np
+
+WINDOW = 300  # frames the rolling percentiles cover, five seconds at 60 frames per second
+
+class _Phase:
+    __slots__ = ("frame", "name", "start")
+    def __init__(self, frame, name): self.frame, self.name = frame, name
+    def __enter__(self): self.start = time.perf_counter()
+    def __exit__(self, *exc):
+        self.frame[self.name] = self.frame.get(self.name, 0.0) + time.perf_counter() - self.start
+
+class _Off:
+    def __enter__(self): pass
+    def __exit__(self, *exc): pass
+
+# --- Per-frame metrics with rolling percentiles ---
+class Profiler:
+    # A frame's metrics are phase times (with profiler.phase(name): ..., summed when a phase runs
+    # several times in the frame, e.g. once per physics sub-step), values set with record(), and
+    # counters passed to end_frame() as running totals, of which the frame gets the increase.
+    # end_frame() closes the frame: the last `window` frames of each metric give the p50/p99, and
+    # with keep=True every frame is also kept for export.
+    def __init__(self, window=WINDOW, keep=False, enabled=True):
+        self.window, self.keep, self.enabled = window, keep, enabled
+        self.samples, self.frames, self.phases = {}, [], set()
+        self.current, self._totals, self._off, self._mark = {}, {}, _Off(), time.perf_counter()
+
+    def phase(self, name):
+        if not self.enabled: return self._off
+        self.phases.add(name)
+        return _Phase(self.current, name)
+
+    def lap(self, name=None):
+        # Phase timing without a with-block: the time since the previous lap goes to `name`
+        # (None only sets the mark), for timing a loop body section by section
+        if not self.enabled: return
+        now = time.perf_counter()
+        if name is not None: self.phases.add(name); self.current[name] = self.current.get(name, 0.0) + now - self._mark
+        self._mark = now
+
+    def record(self, name, value):
+        if self.enabled: self.current[name] = value
+
+    def end_frame(self, **totals):
+        if not self.enabled: return
+        frame, self.current = self.current, {}
+        for name, total in totals.items():
+            frame[name] = total - self._totals.get(name, 0); self._totals[name] = total
+        for name, value in frame.items():
+            samples = self.samples.get(name)
+            if samples is None: samples = self.samples[name] = collections.deque(maxlen=self.window)
+            samples.append(value)
+        if self.keep: self.frames.append(frame)
+
+    def reset(self, **totals):
+        # Forget every frame; counters count from the given totals (0 for others)
+        self.samples, self.frames, self.current, self._totals = {}, [], {}, dict(totals)
+
+    def stats(self):
+        # name -> (p50, p99) over the window; phase times in seconds
+        return {name: tuple(np.percentile(list(samples), (50, 99)).tolist()) for name, samples in sorted(self.samples.items()) if samples}
+
+    def summary(self):
+        # Over every kept frame (or the window): mean, p50, p99, max and total of each metric
+        out = {}
+        for name in sorted(self.samples):
+            values = np.array([f[name] for f in self.frames if name in f] if self.keep else list(self.samples[name]), dtype=float)
+            if not len(values): continue
+            p50, p99 = np.percentile(values, (50, 99)).tolist()
+            out[name] = {"mean": float(values.mean()), "p50": p50, "p99": p99, "max": float(values.max()), "total": float(values.sum()),
+                         "unit": "s" if name in self.phases else "count"}
+        return out
+
+    # --- Export ---
+    def write_csv(self, path):
+        # One row per kept frame, one column per metric
+        names = sorted(set().union(*self.frames)) if self.frames else []
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f); writer.writerow(["frame"] + names)
+            for k, frame in enumerate(self.frames): writer.writerow([k] + [frame.get(name, 0) for name in names])
+
+    def write_json(self, path, **meta):
+        with open(path, "w") as f: json.dump({**meta, "summary": self.summary(), "frames": self.frames}, f)
+
+    def write(self, path, **meta):
+        # By extension: .csv for the frames, anything else JSON with the summary as well
+        if path.endswith(".csv"): self.write_csv(path)
+        else: self.write_json(path, **meta)
+
+OFF = Profiler(enabled=False)  # the default everywhere: phases and records cost a single check
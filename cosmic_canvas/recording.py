@@ -0,0 +1,120 @@
+import collections
+import json
+import os
+import numpy as np
+
+from .constants import STAGES, STAGE_CODES
+from .world import Planet
+
+FORMAT_VERSION = 1
+STATE_FIELDS = ("pos", "vel", "mass", "radius", "stage", "supernova_timer")
+CHUNK_BYTES = 64 << 20  # a trajectory chunk file is closed once it reaches about this size
+OPEN_CHUNKS = 8         # chunk files a reader keeps mapped at once
+# A recorded frame: where its rows are. A recorded row: what the renderer needs to draw one body.
+FRAME = np.dtype([("step", "<i8"), ("chunk", "<i4"), ("count", "<i4"), ("offset", "<i8")])
+ROW = np.dtype([("pos", "<f4", 2), ("radius", "<f4"), ("stage", "i1"), ("timer", "u1"), ("color", "u1", 3)])
+
+def frame_rows(world):
+    # The ROW records of every body in the world, in body order
+    b, n = world.bodies, world.bodies.n
+    rows = np.empty(n, dtype=ROW)
+    rows["pos"], rows["radius"], rows["stage"] = b.pos[:n], b.radius[:n], b.stage[:n]
+    rows["timer"] = np.minimum(b.supernova_timer[:n], 255)
+    rows["color"] = np.array([p.color for p in world], dtype=np.uint8).reshape(n, 3)
+    return rows
+
+# --- Save files: the full state of a World ---
+def save_state(path, world, camera=None, **meta):
+    # One compressed .npz: the body columns, colours, and a JSON header with the world settings,
+    # camera ({"offset": [x, y], "zoom": z}) and anything passed in meta
+    b, n = world.bodies, world.bodies.n
+    header = {"version": FORMAT_VERSION, "stages": STAGES, "solver": world.solver, "theta": world.theta,
+              "integrator": world.integrator, "events": dict(world.events), "camera": camera, **meta}
+    arrays = {name: getattr(b, name)[:n] for name in STATE_FIELDS}
+    colors = np.array([p.color for p in world], dtype=np.uint8).reshape(n, 3)
+    with open(path, "wb") as f: np.savez_compressed(f, header=json.dumps(header), color=colors, **arrays)
+
+def load_state(path, world):
+    # Replaces the contents of `world` with a saved state and returns the header (camera included)
+    with np.load(path) as data:
+        header = json.loads(str(data["header"]))
+        if header.get("version") != FORMAT_VERSION: raise ValueError(f"{path} is save format {header.get('version')}, expected {FORMAT_VERSION}")
+        columns = {name: data[name] for name in STATE_FIELDS}; colors = data["color"].tolist()
+    world.clear()
+    world.solver, world.theta, world.integrator = header["solver"], header["theta"], header["integrator"]
+    world.events = collections.Counter(header["events"])
+    stages = header["stages"]
+    for i, ((x, y), (vx, vy)) in enumerate(zip(columns["pos"].tolist(), columns["vel"].tolist())):
+        p = Planet(x, y, vx, vy, columns["mass"][i], tuple(colors[i]), columns["radius"][i], stages[columns["stage"][i]])
+        p.supernova_timer = columns["supernova_timer"][i]; world.append(p)
+    return header
+
+# --- Trajectories: a directory of append-only chunk files plus a frame index ---
+def unused_path(path):
+    # path itself if nothing is there yet, else the first free path_2, path_3, ... (before the extension)
+    root, ext = os.path.splitext(path); k = 1
+    while os.path.exists(path): k += 1; path = f"{root}_{k}{ext}"
+    return path
+
+class TrajectoryWriter:
+    # meta.json describes the recording, frames.bin holds one FRAME record per frame and
+    # chunk_NNNNN.bin the ROW records. Frames never straddle chunks, so a reader can map any frame
+    # from a single chunk file. The directory must not exist yet (FileExistsError), see unused_path.
+    def __init__(self, path, meta=None, chunk_bytes=CHUNK_BYTES):
+        os.makedirs(path)
+        self.path, self.chunk_bytes, self.chunk, self.offset, self.frames = path, chunk_bytes, -1, 0, 0
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({"version": FORMAT_VERSION, "stages": STAGES, "row": ROW.descr, **(meta or {})}, f)
+        self._index, self._chunk = open(os.path.join(path, "frames.bin"), "ab"), None
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+    def append(self, step, world):
+        rows = frame_rows(world); n = len(rows)
+        if self._chunk is None or (self.offset and self.offset + rows.nbytes > self.chunk_bytes):
+            if self._chunk is not None: self._chunk.close()
+            self.chunk, self.offset = self.chunk + 1, 0
+            self._chunk = open(os.path.join(self.path, f"chunk_{self.chunk:05d}.bin"), "wb")
+        rows.tofile(self._chunk)
+        # The index entry goes last, so a reader never sees a frame whose rows are not on disk yet
+        self._chunk.flush()
+        np.array([(step, self.chunk, n, self.offset)], dtype=FRAME).tofile(self._index); self._index.flush()
+        self.offset += rows.nbytes; self.frames += 1
+
+    def close(self):
+        if self._chunk is not None: self._chunk.close(); self._chunk = None
+        self._index.close()
+
+class Trajectory:
+    # Read side: frames come straight out of memory-mapped chunks, so only the pages a frame touches
+    # are ever read and recordings far larger than RAM can be scrubbed freely.
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json")) as f: self.meta = json.load(f)
+        if self.meta.get("version") != FORMAT_VERSION: raise ValueError(f"{path} is trajectory format {self.meta.get('version')}, expected {FORMAT_VERSION}")
+        self.path, self._maps = path, collections.OrderedDict()
+        # Stage codes are stored as they were when recorded; map them onto the current ones by name
+        self.stage_map = np.array([STAGE_CODES[name] for name in self.meta["stages"]], dtype=np.int8)
+        self.refresh()
+
+    def refresh(self):
+        # Picks up frames appended since opening (the recording may still be running)
+        index = os.path.join(self.path, "frames.bin"); count = os.path.getsize(index) // FRAME.itemsize
+        self.frames = np.memmap(index, dtype=FRAME, mode="r", shape=(count,)) if count else np.zeros(0, dtype=FRAME)
+
+    def __len__(self): return len(self.frames)
+
+    def step(self, k): return int(self.frames[k]["step"])
+
+    def frame(self, k):
+        # ROW records of frame k, a read-only view into its chunk
+        step, chunk, count, offset = self.frames[k].tolist()
+        if not count: return np.zeros(0, dtype=ROW)
+        end = offset + count * ROW.itemsize; data = self._maps.get(chunk)
+        if data is None or len(data) < end:  # not mapped yet, or mapped before this frame was written
+            data = self._maps[chunk] = np.memmap(os.path.join(self.path, f"chunk_{chunk:05d}.bin"), dtype=np.uint8, mode="r")
+            if len(self._maps) > OPEN_CHUNKS: self._maps.popitem(last=False)
+        else: self._maps.move_to_end(chunk)
+        return data[offset:end].view(ROW)
+
+    def stages(self, rows): return self.stage_map[rows["stage"]]
@@ -0,0 +1,220 @@
+import collections
+import math
+import numpy as np
+import pygame
+
+from .barnes_hut import expand_ranges
+from .constants import STAGES, STAGE_CODES
+from .profiler import OFF
+
+GLOW_SCALE = {"RED_DWARF": 1.5, "STAR": 2.5, "RED_GIANT": 3.5, "BLUE_GIANT": 3.0, "WHITE_DWARF": 2.0}
+GLOW_COLOR = {"RED_DWARF": (255,100,50,80), "STAR": (255,255,200,50), "RED_GIANT": (255,69,0,70), "BLUE_GIANT": (170,220,255,70), "WHITE_DWARF": (240,240,255,40)}
+BODY_SCALE = {"RED_GIANT": 2.0, "BLUE_GIANT": 1.5}  # giants are drawn larger than their collision radius
+FLASH_FRAMES = 120          # length of the supernova flash, matches Planet.go_supernova
+EXACT_SPRITE_RADIUS = 32    # sprites up to this radius are exact, larger ones snap to 1/16-octave steps
+SPRITE_PIXELS = 8_000_000   # pixel budget of the sprite cache (32 MB of RGBA)
+TRAIL_LOD_PIXELS = 2.0      # trails are thinned until consecutive points are about this far apart on screen
+STAMP_RADIUS = 4            # discs up to this radius can be stamped as pixels instead of drawn one by one
+BULK_MIN = 256              # with at least this many such discs on screen they are stamped
+SELECT_COLOR, MARK_COLOR = (255,255,255), (100,200,255)  # rings around the selected body and a multi-selection
+
+# Per-stage lookups indexed by BodyArrays.stage codes
+_body_scale = np.array([BODY_SCALE.get(s, 1.0) for s in STAGES])
+_glow_scale = np.array([GLOW_SCALE.get(s, 0.0) for s in STAGES])
+BLACK_HOLE, NEUTRON_STAR = STAGE_CODES["BLACK_HOLE"], STAGE_CODES["NEUTRON_STAR"]
+
+def quantize(radius):
+    if radius <= EXACT_SPRITE_RADIUS: return radius
+    return int(round(2 ** (round(math.log2(radius) * 16) / 16)))
+
+# --- Pre-rendered glow discs ---
+class SpriteCache:
+    # Keyed by (stage, radius); "SUPERNOVA" is the white flash, faded with set_alpha at blit time.
+    # Least recently used sprites are dropped once the pixel budget is spent.
+    def __init__(self, max_pixels=SPRITE_PIXELS):
+        self.sprites, self.pixels, self.max_pixels = collections.OrderedDict(), 0, max_pixels
+        self.hits = self.misses = 0
+
+    def __len__(self): return len(self.sprites)
+
+    def get(self, stage, radius):
+        key = (stage, radius); sprite = self.sprites.get(key)
+        if sprite is not None:
+            self.sprites.move_to_end(key); self.hits += 1
+            return sprite
+        self.misses += 1
+        sprite = pygame.Surface((radius*2, radius*2), pygame.SRCALPHA)
+        pygame.draw.circle(sprite, GLOW_COLOR.get(stage, (255,255,255,255)), (radius, radius), radius)
+        self.sprites[key] = sprite; self.pixels += 4 * radius * radius
+        while self.pixels > self.max_pixels and len(self.sprites) > 1:
+            _, old = self.sprites.popitem(last=False); w, h = old.get_size(); self.pixels -= w * h
+        return sprite
+
+# Where each body lands on screen this frame (arrays over all bodies): vis indexes the visible ones,
+# effects those of them with a glow, flash or ring
+Layout = collections.namedtuple("Layout", "visible vis effects xy radius glow flash progress stage")
+
+# --- Renderer: draws a whole World per frame in layers ---
+class Renderer:
+    def __init__(self, size, sprites=None):
+        self.width, self.height = size
+        self.sprites = sprites if sprites is not None else SpriteCache()
+        self.drawn = self.culled = self.trail_points = 0  # last frame's counts
+        self.profiler = OFF  # times the layers when set to a profiler.Profiler
+        self._disc = self._canvas = None
+
+    def to_screen(self, pos, offset, zoom):
+        # World to screen coordinates for a whole (n, 2) array at once
+        return (pos - offset) * zoom + (self.width / 2, self.height / 2)
+
+    def to_world(self, xy, offset, zoom):
+        # Screen to world coordinates, the inverse of to_screen, for one point or an (n, 2) array
+        return (np.asarray(xy, dtype=float) - (self.width / 2, self.height / 2)) / zoom + offset
+
+    def visible_rect(self, offset, zoom):
+        half = np.array([self.width / 2, self.height / 2]) / zoom
+        return offset - half, offset + half
+
+    def draw(self, screen, world, offset, zoom, selected=None, marked=()):
+        # selected: the Planet ringed in white; marked: Planets ringed in blue (a multi-selection)
+        b, n = world.bodies, world.bodies.n
+        f = self.layout(b.pos[:n], b.radius[:n], b.stage[:n], b.supernova_timer[:n], offset, zoom)
+        colors = np.array([p.color for p in world.planets], dtype=np.uint8).reshape(n, 3)
+        rings = [(p._i, MARK_COLOR) for p in marked if p in world] + ([(selected._i, SELECT_COLOR)] if selected in world else [])
+        self._draw(screen, f, colors, world.trails, b.trail[:n], offset, zoom, rings)
+
+    def draw_snapshot(self, screen, snap, offset, zoom, selected=None, marked=()):
+        # A simulation.Snapshot: the same layers, from the copies the simulation thread published
+        rows = snap.rows
+        f = self.layout(rows["pos"], rows["radius"], rows["stage"], rows["timer"], offset, zoom)
+        rings = []
+        if marked or selected is not None:
+            row_of = {p: i for i, p in enumerate(snap.planets)}
+            rings = [(row_of[p], MARK_COLOR) for p in marked if p in row_of] + ([(row_of[selected], SELECT_COLOR)] if selected in row_of else [])
+        self._draw(screen, f, rows["color"], snap.trails, snap.slots, offset, zoom, rings)
+
+    def _draw(self, screen, f, colors, trails, slots, offset, zoom, rings=()):
+        prof = self.profiler
+        with prof.phase("effects"): self.draw_effects(screen, f)
+        if trails is not None:
+            with prof.phase("trails"): self.draw_trails(screen, trails, slots, f.stage, colors, offset, zoom)
+        with prof.phase("discs"): self.draw_discs(screen, f, colors[f.vis])
+        for i, color in rings:
+            if f.visible[i]: pygame.draw.circle(screen, color, f.xy[i].tolist(), int(f.radius[i]) + 4, 2)
+
+    def draw_rows(self, screen, rows, stage, offset, zoom):
+        # A recorded frame (recording.ROW records, stage codes already mapped), without trails
+        f = self.layout(rows["pos"], rows["radius"], stage, rows["timer"], offset, zoom)
+        self._draw(screen, f, rows["color"], None, None, offset, zoom)
+
+    def layout(self, pos, radius, stage, timer, offset, zoom):
+        # Screen position and drawn sizes of every body, and which of them are on screen
+        with self.profiler.phase("layout"):
+            xy = self.to_screen(pos, offset, zoom).astype(int)
+            stage = stage.astype(int)
+            radius = (np.maximum(2, (radius * zoom).astype(int)) * _body_scale[stage]).astype(int)
+            glow = (radius * _glow_scale[stage]).astype(int)
+            progress = (FLASH_FRAMES - timer) / FLASH_FRAMES
+            flash = np.where(timer > 0, (progress * 500 * zoom).astype(int), 0)
+            # Frustum culling: skip bodies whose largest drawn feature (disc, glow, ring, flash) is off screen
+            reach = np.maximum(np.maximum(radius + 8, glow), flash)
+            visible = (xy[:, 0] + reach >= 0) & (xy[:, 0] - reach < self.width) & (xy[:, 1] + reach >= 0) & (xy[:, 1] - reach < self.height)
+            vis = np.flatnonzero(visible)
+            self.drawn, self.culled, self.trail_points = len(vis), len(pos) - len(vis), 0
+            effects = vis[(flash[vis] > 0) | (glow[vis] > 0) | (stage[vis] == BLACK_HOLE) | (stage[vis] == NEUTRON_STAR)]
+        return Layout(visible, vis, effects, xy, radius, glow, flash, progress, stage)
+
+    def draw_effects(self, screen, f):
+        e = f.effects
+        items = list(zip(f.xy[e].tolist(), f.radius[e].tolist(), f.glow[e].tolist(), f.flash[e].tolist(), f.progress[e].tolist(), f.stage[e].tolist()))
+        for (x, y), _, glow, flash, progress, stage in items:
+            if flash > 0:
+                alpha = int((1 - progress**2) * 200)
+                if alpha > 0:
+                    size = quantize(flash); sprite = self.sprites.get("SUPERNOVA", size); sprite.set_alpha(alpha)
+                    screen.blit(sprite, (x - size, y - size))
+            if glow > 0:
+                size = quantize(glow)
+                screen.blit(self.sprites.get(STAGES[stage], size), (x - size, y - size))
+        pulse = int(abs(math.sin(pygame.time.get_ticks() * 0.01)) * 4)
+        for xy, radius, _, _, _, stage in items:
+            if stage == BLACK_HOLE: pygame.draw.circle(screen, (255,165,0), xy, radius + 5, 3)
+            elif stage == NEUTRON_STAR: pygame.draw.circle(screen, (200,220,255,150), xy, radius + pulse, 1)
+
+    def draw_discs(self, screen, f, colors):
+        # colors: (len(f.vis), 3) uint8, one per visible body. Once there are many, discs up to
+        # STAMP_RADIUS (with their centre within that of the screen) are written straight into the
+        # pixel array in one scatter, after the others.
+        vis, xy, radius = f.vis, f.xy[f.vis], f.radius[f.vis]
+        small = (radius >= 1) & (radius <= STAMP_RADIUS) & (xy >= -STAMP_RADIUS).all(axis=1) & (xy[:, 0] < self.width + STAMP_RADIUS) & (xy[:, 1] < self.height + STAMP_RADIUS)
+        bulk = small.sum() >= BULK_MIN and self._can_stamp(screen)
+        if bulk and small.all(): stamped, vis = (xy, radius, colors), vis[:0]
+        elif bulk: stamped, vis, colors = (xy[small], radius[small], colors[small]), vis[~small], colors[~small]
+        for xy, radius, color in zip(f.xy[vis].tolist(), f.radius[vis].tolist(), colors.tolist()): pygame.draw.circle(screen, color, xy, radius)
+        if bulk: self._stamp(screen, *stamped)
+
+    def _can_stamp(self, screen): return screen.get_bytesize() == 4
+
+    def _disc_offsets(self):
+        # Row r: the (dx, dy) of the pixels pygame.draw.circle fills for radius r, padded to the
+        # widest row with the centre pixel (filled again, which changes nothing); and row lengths
+        rows = []
+        for r in range(STAMP_RADIUS + 1):
+            size = 2 * r + 1; probe = pygame.Surface((size, size)); probe.fill((0,0,0))
+            if r: pygame.draw.circle(probe, (255,255,255), (r, r), r)
+            dx, dy = np.nonzero(pygame.surfarray.array2d(probe)); rows.append((dx - r, dy - r))
+        width = max(len(dx) for dx, _ in rows)
+        dx, dy = (np.array([np.pad(d[k], (0, width - len(d[k]))) for d in rows]) for k in (0, 1))
+        return dx, dy, np.array([len(d[0]) for d in rows])
+
+    def _stamp(self, screen, xy, radius, colors):
+        if self._disc is None: self._disc = self._disc_offsets()
+        dx, dy, count = self._disc
+        # A padded copy of the screen takes the discs, so no pixel needs a bounds test
+        pad = 2 * STAMP_RADIUS; w, h = self.width + 2 * pad, self.height + 2 * pad
+        if self._canvas is None or self._canvas.shape != (h, w): self._canvas = np.empty((h, w), dtype=np.uint32)
+        canvas = self._canvas; inner = canvas[pad:pad + self.height, pad:pad + self.width]
+        # 32-bit pixels written as whole words, the colour packed the way the surface stores it
+        packed = np.full(len(colors), screen.get_masks()[3], dtype=np.uint32)  # opaque, like draw.circle
+        for c, shift in enumerate(screen.get_shifts()[:3]): packed |= colors[:, c].astype(np.uint32) << np.uint32(shift)
+        k = int(count[radius.max()])  # the widest disc in this batch sets the row length
+        offsets = (dy[:, :k] * w + dx[:, :k]).astype(np.int64)
+        base = (xy[:, 1].astype(np.int64) + pad) * w + xy[:, 0] + pad
+        pixels = pygame.surfarray.pixels2d(screen); inner[...] = pixels.T
+        # (bodies, pixels) in C order is body-major, so where discs overlap the later body wins, as with draw.circle
+        canvas.reshape(-1)[base[:, None] + offsets[radius]] = packed[:, None]
+        pixels.T[...] = inner
+        del pixels
+
+    def draw_trails(self, screen, trails, slots, stage, colors, offset, zoom):
+        # slots, stage and colors: one per body, as in BodyArrays. Every trail is fetched, culled,
+        # transformed and thinned as one set of arrays; only the line drawing goes body by body.
+        lo, hi = self.visible_rect(offset, zoom)
+        bodies = np.flatnonzero(trails.count[slots] >= 2)
+        points, start = trails.gather(slots[bodies])
+        n = np.diff(start); ok = n >= 2
+        if not ok.any(): return
+        # Cull trails whose bounding box misses the view (reduceat over non-empty trails only, as an
+        # empty one would take the next trail's first point)
+        full = n > 0
+        tmin, tmax = np.minimum.reduceat(points, start[:-1][full], axis=0), np.maximum.reduceat(points, start[:-1][full], axis=0)
+        ok[full] &= ~((tmax < lo).any(axis=1) | (tmin > hi).any(axis=1))
+        bodies, first, n = bodies[ok], start[:-1][ok], n[ok]
+        if not len(bodies): return
+        owner, k = expand_ranges(first, n); j = k - first[owner]  # each drawn point's trail, and its place in it
+        xy = self.to_screen(points[k], offset, zoom)
+        # Level of detail: zoomed out, many points land on the same pixel, so keep every stride-th
+        # point of a trail (and always its last), with the stride from its mean screen spacing
+        step = np.concatenate([[0.0], np.cumsum(np.abs(np.diff(xy, axis=0)).sum(axis=1))])
+        end = np.cumsum(n) - 1; begin = end - n + 1
+        spacing = (step[end] - step[begin]) / (n - 1)
+        stride = np.where(spacing > 0, TRAIL_LOD_PIXELS / np.where(spacing > 0, spacing, 1), n).astype(int)
+        stride = np.maximum(stride, 1)
+        last = j == n[owner] - 1
+        keep = last | (j % stride[owner] == 0)
+        xy, owner = xy[keep], owner[keep]
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(owner, minlength=len(bodies)))]).tolist()
+        self.trail_points += len(xy)
+        xy = xy.tolist()
+        color = np.where((stage[bodies] == BLACK_HOLE)[:, None], (138,43,226), colors[bodies]).tolist()
+        for c, a, b in zip(color, bounds[:-1], bounds[1:]): pygame.draw.lines(screen, c, False, xy[a:b], 1)
@@ -0,0 +1,68 @@
+import random
+import numpy as np
+
+from .constants import G, RED_GIANT_MASS, CHANDRASEKHAR_LIMIT, BLACK_HOLE_MASS
+from .world import Planet, circular_velocity
+
+SCENARIOS = ["Playground", "Solar System", "Binary Star System", "Black Hole Center", "Binary Black Holes", "Dying Star", "Galaxy"]
+# Tunable numbers per preset, overridable through load_scenario's keyword arguments (used for parameter sweeps)
+PARAMETERS = {
+    "Solar System": {"sun_mass": 450000},
+    "Binary Star System": {"m1": 300000, "m2": 200000, "distance": 400},
+    "Black Hole Center": {"bh_mass": 2000000},
+    "Binary Black Holes": {"mass": 2000000, "distance": 400},
+    "Dying Star": {"giant_mass": RED_GIANT_MASS, "dwarf_mass": CHANDRASEKHAR_LIMIT*0.9},
+    "Galaxy": {"bodies": 1500},
+}
+BARNES_HUT_MIN = 2000  # from about this many bodies the Barnes-Hut tree is faster than exact summation
+
+def check_parameters(name, params):
+    # Raises ValueError for parameter names the preset does not have
+    unknown = set(params) - set(PARAMETERS.get(name, {}))
+    if unknown: raise ValueError(f"{name} has no parameter(s) {sorted(unknown)}, expected some of {sorted(PARAMETERS.get(name, {}))}")
+
+def load_scenario(world, name, center=(500.0, 400.0), **params):
+    # Refills `world` with a preset and returns the camera zoom it is meant to be viewed at
+    if name not in SCENARIOS: raise ValueError(f"unknown scenario {name!r}, expected one of {SCENARIOS}")
+    check_parameters(name, params)
+    p = {**PARAMETERS.get(name, {}), **params}
+    world.clear(); world.solver = "exact"
+    camera_zoom, center_pos = 1.0, [float(center[0]), float(center[1])]
+    if name == "Playground": return camera_zoom
+    if name == "Dying Star":
+        camera_zoom=1.2; giant = Planet(center_pos[0]-100, center_pos[1], 0, 0.5, p["giant_mass"], stage="RED_GIANT")
+        wd = Planet(center_pos[0]+250, center_pos[1], 0, -1.5, p["dwarf_mass"], stage="WHITE_DWARF", radius=15); world.extend([giant, wd])
+    elif name == "Solar System":
+        camera_zoom = 0.4; sun = Planet(center_pos[0], center_pos[1], 0, 0, p["sun_mass"], stage="STAR"); world.append(sun)
+        p_data = [(160,5,(169,169,169)), (220,10,(218,165,32)), (290,12,(0,191,255)), (380,8,(255,69,0)), (600,500,(210,180,140)), (800,300,(240,230,140)),(1000,100,(173,216,230)),(1150,90,(0,0,205))]
+        for i, (dist, mass, color) in enumerate(p_data):
+            angle=random.uniform(0,2*np.pi); vel=circular_velocity(sun.mass, dist)
+            px,py,vx,vy = center_pos[0]+dist*np.cos(angle),center_pos[1]+dist*np.sin(angle),-vel*np.sin(angle),vel*np.cos(angle)
+            world.append(Planet(px,py,vx,vy,mass,color))
+    elif name == "Binary Star System":
+        camera_zoom=0.5; m1,m2 = p["m1"],p["m2"]; total_mass,dist = m1+m2,p["distance"]
+        r1,r2 = dist*m2/total_mass, dist*m1/total_mass; vel_base = np.sqrt(G/(dist*total_mass)); v1,v2=m2*vel_base, m1*vel_base
+        world.extend([Planet(center_pos[0]-r1, center_pos[1], 0, v1, m1, stage="STAR"), Planet(center_pos[0]+r2, center_pos[1], 0, -v2, m2, stage="STAR")])
+        p_data = [(700,500,(173,216,230)), (850,800,(144,238,144)), (1000,600,(218,112,214))]
+        for i, (dist_p, mass_p, color_p) in enumerate(p_data):
+            angle=(2*np.pi/len(p_data))*i; vel=circular_velocity(total_mass, dist_p)
+            px,py,vx,vy = center_pos[0]+dist_p*np.cos(angle), center_pos[1]+dist_p*np.sin(angle),-vel*np.sin(angle),vel*np.cos(angle)
+            world.append(Planet(px,py,vx,vy,mass_p,color_p))
+    elif name == "Black Hole Center":
+        camera_zoom=0.6; bh=Planet(center_pos[0],center_pos[1],0,0,p["bh_mass"],stage="BLACK_HOLE"); world.append(bh)
+        p_data = [(200,300,(255,69,0)),(350,500,(221,160,221)),(500,400,(100,149,237)),(600,100,(240,230,140)),(750,800,(32,178,170))]
+        for i, (dist, mass, color) in enumerate(p_data):
+            angle=(2*np.pi/len(p_data))*i; vel=circular_velocity(bh.mass, dist)
+            px,py,vx,vy = center_pos[0]+dist*np.cos(angle),center_pos[1]+dist*np.sin(angle),-vel*np.sin(angle),vel*np.cos(angle)
+            world.append(Planet(px,py,vx,vy,mass,color))
+    elif name == "Binary Black Holes":
+        camera_zoom=1.0; mass,distance = p["mass"],p["distance"]; orbital_v = np.sqrt((G*mass)/(2*distance))
+        world.extend([Planet(center_pos[0]-distance/2,center_pos[1],0,orbital_v,mass,stage="BLACK_HOLE"), Planet(center_pos[0]+distance/2,center_pos[1],0,-orbital_v,mass,stage="BLACK_HOLE")])
+    elif name == "Galaxy":
+        # Exact summation up to a couple of thousand bodies, the tree beyond that
+        camera_zoom=0.35; world.solver = "barnes_hut" if p["bodies"] >= BARNES_HUT_MIN else "exact"; core=Planet(center_pos[0],center_pos[1],0,0,BLACK_HOLE_MASS,stage="BLACK_HOLE"); world.append(core)
+        for i in range(int(p["bodies"])):
+            dist=random.uniform(250,1400); angle=random.uniform(0,2*np.pi); vel=circular_velocity(core.mass, dist)
+            px,py,vx,vy = center_pos[0]+dist*np.cos(angle),center_pos[1]+dist*np.sin(angle),-vel*np.sin(angle),vel*np.cos(angle)
+            world.append(Planet(px,py,vx,vy,random.uniform(5,40)))
+    return camera_zoom
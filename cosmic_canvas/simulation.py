@@ -0,0 +1,141 @@
+import collections
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from .constants import DT
+from .integrators import SUB_STEPS
+from .profiler import Profiler
+from .recording import frame_rows
+
+FRAME_RATE = 60    # simulated frames of DT per wall-clock second, the speed the window always ran at
+MAX_CATCH_UP = 5   # frames run back to back to catch up after a slow one, any further backlog is dropped
+
+# What the UI draws: recording.ROW records of every body plus the body masses, the Planet objects
+# (to pick and identify bodies) and a copy of the trails, with the frame number and publish time
+Snapshot = collections.namedtuple("Snapshot", "frame time rows mass planets trails slots")
+
+# --- Simulation: steps a World on its own thread ---
+class Simulation:
+    # One frame is DT of simulated time in the integrator's sub-steps, followed by a tick. Frames run
+    # at a fixed `rate` per second (None: as fast as they can), independent of how fast the window
+    # draws. The force kernels are NumPy and release the GIL, so the UI stays responsive during a
+    # heavy frame. Once started, the World belongs to the simulation thread: the UI changes it only
+    # through submit/call, whose commands run between frames, and reads it only through view().
+    def __init__(self, world, rate=FRAME_RATE):
+        self.world, self.rate, self.paused, self.held = world, rate, False, None
+        self.frame, self.frame_seconds = 0, 0.0  # frames simulated, wall time of the last one
+        self.observers = []  # called as observer(frame, world) on the simulation thread after each frame
+        self.dropped = []    # (observer, exception) of observers removed because they raised
+        self.error = None    # the exception that stopped the simulation thread, if one did
+        self.profiler = world.profiler = Profiler()  # phases of every frame and its steps, read by the overlay
+        self._commands, self._lock, self._thread, self._running = queue.SimpleQueue(), threading.Lock(), None, False
+        self._back = self._front = None; self._viewed = True
+        self._publish()
+
+    def __enter__(self): self.start(); return self
+    def __exit__(self, *exc): self.stop()
+
+    def start(self):
+        if self._thread is not None: return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="simulation", daemon=True); self._thread.start()
+
+    def stop(self):
+        if self._thread is None: return
+        self._running = False; self._commands.put(None); self._thread.join(); self._thread = None
+        if self.error is None: self._drain()
+        else: self._fail()
+
+    def submit(self, fn, *args, **kwargs):
+        # Runs fn(*args, **kwargs) on the simulation thread before its next frame; returns a Future.
+        # Before start() (or after stop()) it runs right away on the caller's thread. Once the thread
+        # has died of an exception, every future fails with it instead of waiting forever.
+        future = Future(); self._commands.put((future, fn, args, kwargs))
+        if self.error is not None: self._fail()
+        elif self._thread is None: self._drain(); self._publish()
+        return future
+
+    def call(self, fn, *args, **kwargs): return self.submit(fn, *args, **kwargs).result()
+
+    def advance(self):
+        # One frame, then publish the new state
+        w, prof, start = self.world, self.profiler, time.perf_counter()
+        with prof.phase("frame"):
+            if not self.paused:
+                sub_steps = SUB_STEPS[w.integrator]; sub_dt = DT / sub_steps
+                for _ in range(sub_steps): w.step(sub_dt, held=self.held)
+                self.frame += 1
+                for observer in list(self.observers):
+                    # A failing observer (a recording on a full disk) is dropped, the simulation goes on
+                    try: observer(self.frame, w)
+                    except Exception as e: self.observers.remove(observer); self.dropped.append((observer, e))
+            w.tick()  # flashes finish even while paused, as they always have
+        self.frame_seconds = time.perf_counter() - start
+        # Running flat out, only copy the state out when the UI has drawn the last copy
+        if self.rate or self._viewed:
+            with prof.phase("publish"): self._publish()
+        prof.record("bodies", len(w))
+        prof.end_frame(pairs=w.pair_interactions, merges=w.events["merges"], captures=w.events["captures"], supernovae=w.events["supernovae"])
+
+    def view(self, now=None):
+        # The state to draw. Double-buffered: the newest snapshot and the one before it, with bodies
+        # moved from the older towards the newer by how far the clock has got through the frame
+        # interval. That runs one frame behind, but moves smoothly at any display rate. Bodies are
+        # only interpolated while the set of bodies is the same in both.
+        if self.error is not None: raise RuntimeError("the simulation thread stopped") from self.error
+        with self._lock: back, front = self._back, self._front
+        self._viewed = True
+        if back is None or back.planets != front.planets or front.time <= back.time: return front
+        now = time.perf_counter() if now is None else now
+        alpha = min(max((now - front.time) / (front.time - back.time), 0.0), 1.0)
+        if alpha == 1.0: return front
+        rows = front.rows.copy(); rows["pos"] = back.rows["pos"] + alpha * (front.rows["pos"] - back.rows["pos"])
+        return front._replace(rows=rows)
+
+    def _publish(self):
+        w = self.world; b, n = w.bodies, w.bodies.n
+        snap = Snapshot(self.frame, time.perf_counter(), frame_rows(w), b.mass[:n].copy(), tuple(w.planets),
+                        w.trails.copy() if w.trails is not None else None, b.trail[:n].copy())
+        with self._lock: self._back, self._front = self._front, snap
+        self._viewed = False
+
+    def _drain(self):
+        # Runs every queued command; returns False once stop() has been asked for
+        while True:
+            try: item = self._commands.get_nowait()
+            except queue.Empty: return True
+            if item is None: return False
+            self._execute(item)
+
+    def _fail(self):
+        # Fails every queued command with the error that stopped the thread
+        while True:
+            try: item = self._commands.get_nowait()
+            except queue.Empty: return
+            if item is not None and item[0].set_running_or_notify_cancel(): item[0].set_exception(self.error)
+
+    def _execute(self, item):
+        future, fn, args, kwargs = item
+        if not future.set_running_or_notify_cancel(): return
+        try: future.set_result(fn(*args, **kwargs))
+        except BaseException as e: future.set_exception(e)
+
+    def _run(self):
+        try: self._loop()
+        except BaseException as e: self.error = e; self._running = False; self._fail()
+
+    def _loop(self):
+        due = time.perf_counter()
+        while self._running:
+            if not self._drain(): break
+            now = time.perf_counter()
+            if self.rate and now < due:
+                # Wait for the next frame, but wake up for commands
+                try: item = self._commands.get(timeout=due - now)
+                except queue.Empty: continue
+                if item is None: break
+                self._execute(item); continue
+            self.advance()
+            if self.rate: due = max(due + 1 / self.rate, time.perf_counter() - MAX_CATCH_UP / self.rate)
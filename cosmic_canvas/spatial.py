@@ -0,0 +1,63 @@
+import numpy as np
+
+from .barnes_hut import expand_ranges
+
+CELL_BODIES = 2.0      # bodies per grid cell if they were spread evenly over their bounding box
+BIG_PERCENTILE = 99    # bodies wider than this percentile of radii are tested directly by at()
+
+# --- Uniform grid over a snapshot of positions, for picking and rectangle selection ---
+class SpatialIndex:
+    # Bodies are sorted by cell key (column-major), so the bodies of one column's run of cells are a
+    # single slice found with two binary searches. A query costs O(columns * log n) plus the bodies
+    # in the cells it covers. Build one per frame from the position arrays; queries return row indices.
+    def __init__(self, pos, radius=None):
+        self.pos = np.asarray(pos, dtype=float).reshape(-1, 2); n = len(self.pos)
+        self.radius = np.zeros(n) if radius is None else np.asarray(radius, dtype=float)
+        self.origin = self.pos.min(axis=0) if n else np.zeros(2)
+        extent = float((self.pos.max(axis=0) - self.origin).max()) if n else 0.0
+        self.cell = max(extent * np.sqrt(CELL_BODIES / max(n, 1)), 1e-9)
+        # A few huge discs (a black hole among dust) would force a wide search around every point
+        self.r_cap = float(np.percentile(self.radius, BIG_PERCENTILE)) if n else 0.0
+        self.big = np.flatnonzero(self.radius > self.r_cap)
+        cells = np.floor((self.pos - self.origin) / self.cell).astype(np.int64)
+        self.cols, self.rows = (int(cells[:, 0].max()) + 1, int(cells[:, 1].max()) + 1) if n else (0, 0)
+        key = cells[:, 0] * self.rows + cells[:, 1]
+        self.order = np.argsort(key, kind="stable"); self.keys = key[self.order]
+
+    def __len__(self): return len(self.pos)
+
+    def _cells(self, lo, hi):
+        # Bodies in the block of cells covering the rectangle lo..hi, a superset of those inside it
+        (c0, r0), (c1, r1) = np.floor((np.asarray(lo) - self.origin) / self.cell), np.floor((np.asarray(hi) - self.origin) / self.cell)
+        c0, c1, r0, r1 = max(int(c0), 0), min(int(c1), self.cols - 1), max(int(r0), 0), min(int(r1), self.rows - 1)
+        if c0 > c1 or r0 > r1: return np.zeros(0, dtype=np.int64)
+        base = np.arange(c0, c1 + 1, dtype=np.int64) * self.rows
+        start = np.searchsorted(self.keys, base + r0, side="left"); end = np.searchsorted(self.keys, base + r1, side="right")
+        _, k = expand_ranges(start, end - start)
+        return self.order[k]
+
+    def in_rect(self, lo, hi):
+        # Rows whose centre lies in the rectangle with corners lo and hi (in any order), ascending
+        lo, hi = np.minimum(lo, hi), np.maximum(lo, hi)
+        found = self._cells(lo, hi); p = self.pos[found]
+        return np.sort(found[((p >= lo) & (p <= hi)).all(axis=1)])
+
+    def at(self, point, slack=0.0):
+        # Rows whose disc, grown by slack, contains the point, ascending
+        point = np.asarray(point, dtype=float); reach = slack + self.r_cap
+        found = np.union1d(self._cells(point - reach, point + reach), self.big)
+        d = self.pos[found] - point
+        return found[(d * d).sum(axis=1) < (self.radius[found] + slack) ** 2]
+
+    def nearest(self, point):
+        # Row of the centre nearest to the point, or -1 if there are no bodies. Widen a square of
+        # cells (starting at the grid's edge for points outside it) until it holds a body; the true
+        # nearest is then no further away than that body.
+        if not len(self): return -1
+        point = np.asarray(point, dtype=float); top = self.origin + self.cell * np.array([self.cols, self.rows])
+        half = float(np.maximum(np.maximum(self.origin - point, point - top), 0).max()) + self.cell
+        found = self._cells(point - half, point + half)
+        while not len(found): half *= 2; found = self._cells(point - half, point + half)
+        d = np.sqrt(((self.pos[found] - point) ** 2).sum(axis=1)).min()
+        found = self._cells(point - d, point + d); d2 = ((self.pos[found] - point) ** 2).sum(axis=1)
+        return int(found[np.argmin(d2)])
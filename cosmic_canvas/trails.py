@@ -0,0 +1,104 @@
+import copy
+import numpy as np
+
+from .barnes_hut import expand_ranges
+
+TRAIL_LENGTH = 500     # physics steps of history a trail covers
+TRAIL_POINTS = 128     # points stored per body; decimation lets a few cover the whole history
+TRAIL_EVERY = 1        # record a point every this many physics steps
+TRAIL_TOLERANCE = 0.5  # how far (world units) a trail may cut a curve when merging points, 0 keeps all
+
+# --- One preallocated slab holding every body's trail ---
+class TrailStore:
+    # Slot s is a ring of `points` float32 positions, each stamped with the step it was recorded at, so
+    # a body costs points * 12 bytes (1.5 KB by default) however long it lives. Bodies hold their slot
+    # in BodyArrays.trail; removing a body only returns the slot to the free list.
+    def __init__(self, span=TRAIL_LENGTH, points=TRAIL_POINTS, every=TRAIL_EVERY, tolerance=TRAIL_TOLERANCE, capacity=64):
+        if points < 2: raise ValueError(f"a trail needs at least 2 points, got points={points}")
+        if every < 1: raise ValueError(f"sampling interval must be at least 1 step, got every={every}")
+        self.span, self.length, self.every, self.tolerance, self.steps = span, points, every, tolerance, 0
+        self.points = np.zeros((capacity, points, 2), dtype=np.float32)
+        self.stamp = np.zeros((capacity, points), dtype=np.int32)
+        self.head = np.zeros(capacity, dtype=np.int32)   # ring slot the next point goes to
+        self.count = np.zeros(capacity, dtype=np.int32)  # points held, at most length
+        self.free = list(range(capacity - 1, -1, -1))
+
+    @property
+    def capacity(self): return len(self.head)
+    @property
+    def bytes_per_body(self): return self.points[0].nbytes + self.stamp[0].nbytes + 8
+    @property
+    def nbytes(self): return self.capacity * self.bytes_per_body
+
+    def reserve(self, capacity):
+        if capacity <= self.capacity: return
+        capacity, old = max(capacity, 2 * self.capacity), self.capacity
+        for name in ("points", "stamp"):
+            arr = getattr(self, name); grown = np.zeros((capacity,) + arr.shape[1:], dtype=arr.dtype)
+            grown[:old] = arr; setattr(self, name, grown)
+        self.head, self.count = np.resize(self.head, capacity), np.resize(self.count, capacity)
+        self.free[:0] = range(capacity - 1, old - 1, -1)
+
+    def copy(self):
+        # A snapshot for drawing on another thread while this one keeps recording
+        other = copy.copy(self)
+        other.points, other.stamp, other.head, other.count, other.free = self.points.copy(), self.stamp.copy(), self.head.copy(), self.count.copy(), []
+        return other
+
+    def acquire(self):
+        if not self.free: self.reserve(self.capacity + 1)
+        slot = self.free.pop(); self.head[slot] = self.count[slot] = 0
+        return slot
+
+    def release(self, slots): self.free.extend(int(s) for s in slots if s >= 0)
+
+    def record(self, pos, slots):
+        # Appends pos[k] to trail slots[k] for all k at once, every `every`-th call
+        self.steps += 1
+        if self.steps % self.every or not len(slots): return
+        L, head, count = self.length, self.head[slots], self.count[slots]
+        point = pos.astype(np.float32)
+        # Decimation: the newest stored point b is overwritten by the new point p (instead of p being
+        # appended) while the path from the point before it (a) through b to p is straight enough:
+        # the arc through a, b, p may bow at most `tolerance` away from the chord a-p. That sagitta is
+        # |ap|^2 * curvature / 8, with curvature 2 |ab x ap| / (|ab| |bp| |ap|).
+        straight = np.zeros(len(slots), dtype=bool)
+        if self.tolerance > 0:
+            k = np.flatnonzero(count >= 2); s, h = slots[k], head[k]
+            a, b, p = self.points[s, (h - 2) % L], self.points[s, (h - 1) % L], point[k]
+            ab, ap, bp = b - a, p - a, p - b
+            bend = np.abs(ab[:, 0] * ap[:, 1] - ab[:, 1] * ap[:, 0]) * np.hypot(ap[:, 0], ap[:, 1])
+            legs = 4 * np.hypot(ab[:, 0], ab[:, 1]) * np.hypot(bp[:, 0], bp[:, 1])
+            sagitta = np.divide(bend, legs, out=np.zeros_like(bend), where=legs > 0)
+            straight[k] = (sagitta <= self.tolerance) & ((ab * bp).sum(axis=1) >= 0)
+        at = np.where(straight, (head - 1) % L, head)
+        self.points[slots, at] = point; self.stamp[slots, at] = self.steps
+        grow = slots[~straight]
+        self.head[grow] = (self.head[grow] + 1) % L
+        self.count[grow] = np.minimum(self.count[grow] + 1, L)
+
+    def get(self, slot):
+        # The last `span` steps of one slot's trail, oldest point first
+        return self.gather([slot])[0]
+
+    def gather(self, slots):
+        # get() for many slots at once, concatenated: trail k is points[start[k]:start[k + 1]]. Ring
+        # indices come from the heads and counts, and the span is cut by comparing stamps across every
+        # trail, so a frame of trails costs a few NumPy calls. A merged segment reaching back past the
+        # span is cut at it by interpolating between its ends.
+        slots = np.asarray(slots, dtype=np.int64).reshape(-1)
+        count = np.where(slots >= 0, self.count[slots], 0).astype(np.int64)
+        owner, k = expand_ranges(np.zeros(len(slots), dtype=np.int64), count)
+        s = slots[owner]; ring = (self.head[s] - count[owner] + k) % self.length
+        points, stamps = self.points[s, ring], self.stamp[s, ring]
+        cut = self.steps - self.span
+        keep = stamps > cut  # stamps rise along a trail, so the kept points are its newest ones
+        kept = np.bincount(owner[keep], minlength=len(slots))
+        first = (kept > 0) & (kept < count)  # trails that start with a point interpolated at the cut
+        start = np.concatenate([[0], np.cumsum(kept + first)])
+        out = np.empty((start[-1], 2), dtype=np.float32)
+        o = owner[keep]; out[start[o] + first[o] + k[keep] - (count - kept)[o]] = points[keep]
+        b = (np.cumsum(count) - kept)[first]; a = b - 1  # first kept point of each cut trail, and the one before
+        t = (cut - stamps[a]) / (stamps[b] - stamps[a])
+        out[start[:-1][first]] = points[a] + t[:, None] * (points[b] - points[a])
+        return out, start
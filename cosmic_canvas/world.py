@@ -0,0 +1,232 @@
+import collections
+import random
+import numpy as np
+
+from .barnes_hut import THETA, QuadTree
+from .collisions import contact_pairs, merge_contacts, resolve_contacts
+from . import integrators
+from .profiler import OFF
+from .trails import TRAIL_LENGTH, TRAIL_POINTS, TRAIL_EVERY, TRAIL_TOLERANCE, TrailStore
+from .constants import G, STAGES, STAGE_CODES, RED_DWARF_MASS, STAR_MASS, RED_GIANT_MASS, BLUE_GIANT_MASS, CHANDRASEKHAR_LIMIT, BLACK_HOLE_MASS
+
+# The pairwise kernel works on blocks of rows holding about this many pairs at a time, so the
+# temporaries stay cache-sized instead of growing to N x N (5k bodies would need 200 MB per array).
+TILE_PAIRS = 32768
+SOLVERS = ("exact", "barnes_hut")
+INTEGRATORS = integrators.INTEGRATORS
+
+# --- Structure-of-arrays storage ---
+class BodyArrays:
+    FIELDS = (("pos", float, 2), ("vel", float, 2), ("mass", float, None), ("radius", float, None), ("stage", np.int8, None), ("supernova_timer", np.int32, None), ("trail", np.int32, None))
+
+    def __init__(self, capacity=64):
+        self.n = 0
+        for name, dtype, width in self.FIELDS:
+            setattr(self, name, np.zeros((capacity, width) if width else capacity, dtype=dtype))
+
+    @property
+    def capacity(self): return len(self.mass)
+
+    def reserve(self, capacity):
+        if capacity <= self.capacity: return
+        capacity = max(capacity, 2 * self.capacity)
+        for name, dtype, width in self.FIELDS:
+            grown = np.zeros((capacity, width) if width else capacity, dtype=dtype)
+            grown[:self.n] = getattr(self, name)[:self.n]; setattr(self, name, grown)
+
+    def copy_row(self, src, i, j):
+        for name, _, _ in self.FIELDS: getattr(self, name)[j] = getattr(src, name)[i]
+
+    def compact(self, keep):
+        # Stable in-place compaction: surviving rows keep their relative order
+        k = int(keep.sum())
+        for name, _, _ in self.FIELDS:
+            arr = getattr(self, name); arr[:k] = arr[:self.n][keep]
+        self.n = k
+
+# --- Kernels ---
+def gravity_accelerations(pos, mass, tile_pairs=TILE_PAIRS, targets=None):
+    # Exact all-pairs accelerations, or only those on the `targets` rows
+    n = len(pos); rows = pos if targets is None else pos[targets]; acc = np.empty((len(rows), 2))
+    px, py, tile = pos[:, 0], pos[:, 1], max(8, tile_pairs // max(n, 1))
+    for a in range(0, len(rows), tile):
+        b = min(a + tile, len(rows))
+        dx = np.subtract.outer(rows[a:b, 0], px); dy = np.subtract.outer(rows[a:b, 1], py)
+        r2 = dx * dx; r2 += dy * dy
+        # w_ij = m_j / r_ij^3, so a_i = G * sum_j w_ij * (x_j - x_i) = G * (w @ x - x_i * sum_j w_ij)
+        w = np.sqrt(r2); w *= r2
+        np.divide(mass, w, out=w, where=r2 > 0)
+        acc[a:b] = G * (w @ pos - w.sum(axis=1)[:, None] * rows[a:b])
+    return acc
+
+# --- Planet: a view onto one row of a BodyArrays ---
+def _field(name, cast=None):
+    def get(self):
+        value = getattr(self._arrays, name)[self._i]
+        return value if cast is None else cast(value)
+    def set(self, value): getattr(self._arrays, name)[self._i] = value
+    return property(get, set)
+
+class Planet:
+    pos, vel = _field("pos"), _field("vel")
+    mass, radius, supernova_timer = _field("mass", float), _field("radius", int), _field("supernova_timer", int)
+
+    def __init__(self, x, y, vx, vy, mass, color=None, radius=None, stage="PLANET"):
+        # A planet owns a private one-row store until it is added to a World
+        self._arrays, self._i = BodyArrays(1), 0; self._arrays.n = 1
+        self.pos, self.vel, self.mass = (float(x), float(y)), (float(vx), float(vy)), float(mass)
+        self.stage, self.color = stage, color
+        self.radius = int(radius if radius is not None else (self.mass/1)**(1/3.0))
+        self.supernova_timer = 0; self._arrays.trail[0] = -1  # no trail slot outside a World
+        if self.color is None:
+            self.set_stage_color()
+
+    @property
+    def stage(self): return STAGES[self._arrays.stage[self._i]]
+    @stage.setter
+    def stage(self, name): self._arrays.stage[self._i] = STAGE_CODES[name]
+
+    def _detach(self):
+        own = BodyArrays(1); own.n = 1; own.copy_row(self._arrays, self._i, 0); own.trail[0] = -1
+        self._arrays, self._i = own, 0
+
+    def set_stage_color(self):
+        if self.stage == "PLANET":
+            if self.color is None: # Only assign random color if no color exists
+                self.color = (random.randint(50, 255), random.randint(50, 255), random.randint(50, 255))
+        elif self.stage == "RED_DWARF": self.color = (255, 100, 50)
+        elif self.stage == "STAR": self.color = (255, 255, 200)
+        elif self.stage == "RED_GIANT": self.color = (255, 69, 0)
+        elif self.stage == "BLUE_GIANT": self.color = (170, 220, 255)
+        elif self.stage == "WHITE_DWARF": self.color = (240, 240, 255)
+        elif self.stage == "NEUTRON_STAR": self.color = (200, 220, 255)
+        elif self.stage == "BLACK_HOLE": self.color = (0, 0, 0)
+
+    def set_stage(self, new_stage):
+        self.stage = new_stage
+        self.set_stage_color()
+
+    def trigger_evolution_check(self):
+        if self.stage == "BLUE_GIANT" and self.mass >= BLACK_HOLE_MASS: self.go_supernova()
+        elif self.stage == "WHITE_DWARF" and self.mass >= CHANDRASEKHAR_LIMIT: self.go_supernova()
+        elif self.stage == "NEUTRON_STAR" and self.mass >= BLACK_HOLE_MASS: self.set_stage("BLACK_HOLE")
+        elif self.stage == "PLANET" and self.mass >= RED_DWARF_MASS: self.set_stage("RED_DWARF")
+        elif self.stage == "RED_DWARF" and self.mass >= STAR_MASS: self.set_stage("STAR")
+        elif self.stage == "STAR" and self.mass >= RED_GIANT_MASS: self.set_stage("RED_GIANT")
+        elif self.stage == "RED_GIANT" and self.mass >= BLUE_GIANT_MASS: self.set_stage("BLUE_GIANT")
+
+    def go_supernova(self):
+        self.supernova_timer = 120
+        self.mass *= 0.8
+        if self.mass >= BLACK_HOLE_MASS:
+            self.set_stage("BLACK_HOLE")
+        else:
+            self.set_stage("NEUTRON_STAR")
+            self.radius = 10
+
+# --- World: owns the arrays and the Planet views, and behaves like the old planets list ---
+class World:
+    def __init__(self, capacity=64, trail_length=TRAIL_LENGTH, solver="exact", theta=THETA, integrator="euler",
+                 trail_points=TRAIL_POINTS, trail_every=TRAIL_EVERY, trail_tolerance=TRAIL_TOLERANCE):
+        self.bodies, self.planets = BodyArrays(capacity), []
+        # Trail history of every body over the last trail_length steps, or None to keep none (headless runs)
+        self.trails = TrailStore(trail_length, trail_points, trail_every, trail_tolerance, capacity) if trail_length else None
+        self.solver, self.theta, self.integrator = solver, theta, integrator
+        self.events = collections.Counter()  # merges, captures and supernovae since creation
+        self.force_evaluations = 0  # accelerations computed, counted per body
+        self.pair_interactions = 0  # terms summed for them: body pairs, plus body-node pairs with Barnes-Hut
+        self.profiler = OFF  # times the phases of each step when set to a profiler.Profiler
+        self._last_acc = None  # (pos, mass, acc) of the last full evaluation
+
+    def __len__(self): return len(self.planets)
+    def __iter__(self): return iter(self.planets)
+    def __getitem__(self, index): return self.planets[index]
+    def __contains__(self, planet): return getattr(planet, "_arrays", None) is self.bodies
+
+    def append(self, planet):
+        if planet in self: return
+        b = self.bodies; b.reserve(b.n + 1)
+        b.copy_row(planet._arrays, planet._i, b.n)
+        planet._arrays, planet._i = b, b.n
+        b.trail[b.n] = self.trails.acquire() if self.trails else -1
+        b.n += 1; self.planets.append(planet)
+
+    def extend(self, planets):
+        for p in planets: self.append(p)
+
+    def remove(self, planet):
+        if planet not in self: raise ValueError("planet is not in this world")
+        keep = np.ones(self.bodies.n, dtype=bool); keep[planet._i] = False
+        self._compact(keep)
+
+    def discard(self, planets):
+        # Removes every given planet that is in this world, in one compaction
+        keep = np.ones(self.bodies.n, dtype=bool); keep[[p._i for p in planets if p in self]] = False
+        if not keep.all(): self._compact(keep)
+
+    def clear(self): self._compact(np.zeros(self.bodies.n, dtype=bool))
+
+    def _compact(self, keep):
+        if self.trails: self.trails.release(self.bodies.trail[:self.bodies.n][~keep])
+        for p in self.planets:
+            if not keep[p._i]: p._detach()
+        self.bodies.compact(keep)
+        self.planets = [p for p, k in zip(self.planets, keep) if k]
+        for i, p in enumerate(self.planets): p._i = i
+
+    def tick(self):
+        # Once per frame: count down supernova flashes, the exploding body stays put until zero
+        timer = self.bodies.supernova_timer[:self.bodies.n]
+        np.maximum(timer - 1, 0, out=timer)
+
+    def accelerations(self, pos=None, targets=None):
+        # Gravity at the current positions (or at `pos`), on every body or only the `targets` rows.
+        # A full evaluation is remembered, so asking again for an unchanged state is free: leapfrog
+        # reuses the closing forces of one step to open the next.
+        b = self.bodies; n = b.n; mass = b.mass[:n]
+        pos = b.pos[:n] if pos is None else pos
+        if targets is not None and len(targets) == n: targets = None
+        last = self._last_acc
+        if targets is None and last is not None and len(last[0]) == n and np.array_equal(last[0], pos) and np.array_equal(last[1], mass): return last[2]
+        with self.profiler.phase("forces"):
+            if self.solver == "exact":
+                acc = gravity_accelerations(pos, mass, targets=targets)
+                self.pair_interactions += n * (n if targets is None else len(targets))
+            elif self.solver == "barnes_hut":
+                # The tree walk has no cheaper per-target form, so a partial request still pays for all
+                tree = QuadTree(pos, mass); acc = tree.accelerations(self.theta); self.pair_interactions += tree.interactions
+                if targets is not None: self.force_evaluations += n - len(targets); acc = acc[targets]
+            else: raise ValueError(f"unknown solver {self.solver!r}, expected one of {SOLVERS}")
+        self.force_evaluations += n if targets is None else len(targets)
+        if targets is None: self._last_acc = (pos.copy(), mass.copy(), acc)
+        return acc
+
+    def step(self, dt, held=None):
+        b = self.bodies; n = b.n
+        if n == 0: return
+        pos, vel = b.pos[:n], b.vel[:n]
+        advance = integrators.SCHEMES.get(self.integrator)
+        if advance is None: raise ValueError(f"unknown integrator {self.integrator!r}, expected one of {INTEGRATORS}")
+        # Bodies being dragged or mid-supernova still pull on others but do not move or absorb
+        active = b.supernova_timer[:n] == 0
+        if held in self: active[held._i] = False
+        prof = self.profiler
+        with prof.phase("integrate"): seen = advance(self, active, dt) or []  # forces included
+        if self.trails:
+            with prof.phase("trails"): self.trails.record(pos[active], b.trail[:n][active])
+        # Collision phase on the new positions, plus any contacts the integrator saw within the step;
+        # non-finite bodies are dropped in the same compaction
+        with prof.phase("collisions"):
+            keep = np.isfinite(pos).all(axis=1) & np.isfinite(vel).all(axis=1)
+            pairs, dists = merge_contacts(seen + [self.contacts()])
+            resolve_contacts(self, pairs, dists, active, keep)
+            if not keep.all(): self._compact(keep)
+
+    def contacts(self):
+        # (pairs, separations) of every two finite bodies that overlap at the current positions
+        b = self.bodies; n = b.n
+        live = np.flatnonzero(np.isfinite(b.pos[:n]).all(axis=1) & np.isfinite(b.vel[:n]).all(axis=1))
+        pairs, dists = contact_pairs(b.pos[live], b.radius[live])
+        return live[pairs], dists
+
+def circular_velocity(m, d): return np.sqrt(G * m / d) if d > 0 else 0
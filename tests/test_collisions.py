@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from cosmic_canvas.collisions import BRUTE_FORCE_MAX, contact_pairs, merge_contacts
+
+def brute_force(pos, radius):
+    # Every pair tested directly, through the full distance matrix, in (i, j) order
+    d = np.sqrt(((pos[:, None, :] - pos[None, :, :]) ** 2).sum(axis=2))
+    i, j = np.triu_indices(len(pos), 1); hit = d[i, j] < radius[i] + radius[j]
+    return list(zip(i[hit].tolist(), j[hit].tolist())), d[i[hit], j[hit]]
+
+def cloud(rng, n, spread, big=0):
+    # Dust of radius 1-3, plus `big` bodies whose radius spans many grid cells
+    pos = rng.uniform(-spread, spread, (n, 2)); radius = rng.uniform(1, 3, n)
+    radius[rng.choice(n, big, replace=False)] = rng.uniform(20, 60, big)
+    return pos, radius
+
+@pytest.mark.parametrize("n, spread, big", [(0, 10, 0), (1, 10, 0), (BRUTE_FORCE_MAX, 40, 0), (BRUTE_FORCE_MAX + 1, 40, 0),
+                                            (500, 150, 0), (500, 150, 4), (2000, 300, 10)])
+@pytest.mark.parametrize("seed", range(3))
+def test_contact_pairs_match_brute_force(n, spread, big, seed):
+    pos, radius = cloud(np.random.default_rng(seed), n, spread, big)
+    pairs, dists = contact_pairs(pos, radius)
+    expected, expected_dists = brute_force(pos, radius)
+    assert [tuple(p) for p in pairs.tolist()] == expected
+    assert np.allclose(dists, expected_dists)
+
+def test_merge_contacts_keeps_closest_separation():
+    pos, radius = cloud(np.random.default_rng(0), 300, 100, 2)
+    moved = pos + np.random.default_rng(1).normal(0, 1, pos.shape)
+    a, b = contact_pairs(pos, radius), contact_pairs(moved, radius)
+    pairs, dists = merge_contacts([a, (np.zeros((0, 2), dtype=int), np.zeros(0)), b])
+    closest = {}
+    for p, d in [*zip(a[0].tolist(), a[1]), *zip(b[0].tolist(), b[1])]:
+        closest[tuple(p)] = min(d, closest.get(tuple(p), np.inf))
+    assert [tuple(p) for p in pairs.tolist()] == sorted(closest)
+    assert np.allclose(dists, [closest[p] for p in sorted(closest)])
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from cosmic_canvas import World, Planet, DT
+from cosmic_canvas.integrators import INTEGRATORS, SUB_STEPS
+
+def crossing(integrator, speed, impact, start):
+    # A small body thrown past a larger one, close enough that their discs must touch on the way
+    world = World(trail_length=0); world.integrator = integrator
+    world.extend([Planet(0, 0, 0, 0, 1000, radius=10), Planet(start, impact, speed, 0, 27, radius=3)])
+    sub_steps = SUB_STEPS[integrator]
+    for _ in range(int(2 * -start / (speed * DT)) + 5):
+        for _ in range(sub_steps): world.step(DT / sub_steps)
+        world.tick()
+    return world.events["merges"] + world.events["captures"]
+
+@pytest.mark.parametrize("integrator", INTEGRATORS)
+@pytest.mark.parametrize("speed", [40, 80])
+def test_fast_crossing_always_merges(integrator, speed):
+    # Every scheme must see the contact, whatever phase of the step grid the bodies meet at
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        impact, start = rng.uniform(-12, 12), -rng.uniform(200, 200 + speed * DT)
+        assert crossing(integrator, speed, impact, start) == 1, (impact, start)
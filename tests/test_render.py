@@ -0,0 +1,31 @@
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy"); os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+import numpy as np
+import pygame
+import pytest
+
+from cosmic_canvas.render import BULK_MIN, STAMP_RADIUS, Layout, Renderer
+
+SIZE = (120, 90)
+
+@pytest.fixture(scope="module")
+def screen():
+    pygame.display.init(); yield pygame.Surface(SIZE, depth=32); pygame.display.quit()
+
+def layout(xy, radius):
+    n = len(xy); vis = np.arange(n)
+    zeros = np.zeros(n, dtype=int)
+    return Layout(np.ones(n, dtype=bool), vis, vis[:0], xy, radius, zeros, zeros, zeros.astype(float), zeros)
+
+@pytest.mark.parametrize("seed", range(3))
+def test_stamped_discs_match_draw_circle(screen, seed):
+    # Overlapping discs of every stampable radius, some hanging off the edges: the scatter must give
+    # exactly the pixels of drawing them one by one, later bodies on top
+    rng = np.random.default_rng(seed); n = 2 * BULK_MIN
+    xy = np.stack([rng.integers(-STAMP_RADIUS, SIZE[0] + STAMP_RADIUS, n), rng.integers(-STAMP_RADIUS, SIZE[1] + STAMP_RADIUS, n)], axis=1)
+    radius = rng.integers(1, STAMP_RADIUS + 1, n); colors = rng.integers(0, 256, (n, 3)).astype(np.uint8)
+    screen.fill((0, 0, 0))
+    for p, r, c in zip(xy.tolist(), radius.tolist(), colors.tolist()): pygame.draw.circle(screen, c, p, r)
+    expected = pygame.surfarray.array3d(screen)
+    screen.fill((0, 0, 0)); Renderer(SIZE).draw_discs(screen, layout(xy, radius), colors)
+    assert (pygame.surfarray.array3d(screen) == expected).all()
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from cosmic_canvas.spatial import SpatialIndex
+
+def bodies(rng, n):
+    # A dense cluster, a sparse halo and a few huge discs, so cells are very unevenly filled
+    pos = np.concatenate([rng.normal(0, 20, (n // 2, 2)), rng.uniform(-1000, 1000, (n - n // 2, 2))])
+    radius = rng.uniform(0.5, 4, n)
+    if n > 10: radius[rng.choice(n, 3, replace=False)] = rng.uniform(100, 300, 3)
+    return pos, radius
+
+def queries(rng, pos, k=200):
+    # Points around and well outside the bodies, including exact body centres
+    points = rng.uniform(-1500, 1500, (k, 2))
+    if len(pos): points[:10] = pos[rng.integers(0, len(pos), 10)]
+    return points
+
+SIZES = [0, 1, 2, 50, 2000]
+
+@pytest.mark.parametrize("n", SIZES)
+def test_in_rect_matches_brute_force(n):
+    rng = np.random.default_rng(n); pos, radius = bodies(rng, n); index = SpatialIndex(pos, radius)
+    a, b = queries(rng, pos, 100), queries(rng, pos, 100)
+    for p, q in zip(a, b):
+        lo, hi = np.minimum(p, q), np.maximum(p, q)
+        expected = np.flatnonzero(((pos >= lo) & (pos <= hi)).all(axis=1))
+        assert np.array_equal(index.in_rect(p, q), expected)
+
+@pytest.mark.parametrize("n", SIZES)
+@pytest.mark.parametrize("slack", [0.0, 15.0])
+def test_at_matches_brute_force(n, slack):
+    rng = np.random.default_rng(n); pos, radius = bodies(rng, n); index = SpatialIndex(pos, radius)
+    for point in queries(rng, pos):
+        expected = np.flatnonzero(np.sqrt(((pos - point) ** 2).sum(axis=1)) < radius + slack)
+        assert np.array_equal(index.at(point, slack), expected)
+
+@pytest.mark.parametrize("n", SIZES)
+def test_nearest_matches_brute_force(n):
+    rng = np.random.default_rng(n); pos, radius = bodies(rng, n); index = SpatialIndex(pos, radius)
+    for point in queries(rng, pos):
+        row = index.nearest(point)
+        if not n: assert row == -1; continue
+        # Compared by distance, as equally near bodies may be returned in any order
+        d = np.sqrt(((pos - point) ** 2).sum(axis=1))
+        assert d[row] == d.min()
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from cosmic_canvas.trails import TrailStore
+
+def reference(store, slot):
+    # One slot's trail read point by point from its ring, oldest first, cut at the span
+    if slot < 0: return np.zeros((0, 2))
+    n, L = int(store.count[slot]), store.length
+    ring = [(int(store.head[slot]) - n + k) % L for k in range(n)]
+    points, stamps = [store.points[slot, r].astype(float) for r in ring], [int(store.stamp[slot, r]) for r in ring]
+    cut = store.steps - store.span; kept = [k for k in range(n) if stamps[k] > cut]
+    if not kept: return np.zeros((0, 2))
+    trail = [points[k] for k in kept]
+    if kept[0] > 0:
+        a, b = kept[0] - 1, kept[0]; t = (cut - stamps[a]) / (stamps[b] - stamps[a])
+        trail.insert(0, points[a] + t * (points[b] - points[a]))
+    return np.array(trail)
+
+def wander(store, rng, steps, n=40):
+    # Bodies on curving and straight paths, some of them acquired late or released on the way
+    slots = np.array([store.acquire() for _ in range(n)])
+    pos, vel = rng.uniform(-100, 100, (n, 2)), rng.uniform(-3, 3, (n, 2))
+    turn = np.where(rng.random(n) < 0.3, 0.0, rng.uniform(-0.2, 0.2, n))
+    for step in range(steps):
+        c, s = np.cos(turn), np.sin(turn)
+        vel = np.stack([c * vel[:, 0] - s * vel[:, 1], s * vel[:, 0] + c * vel[:, 1]], axis=1)
+        pos = pos + vel; store.record(pos, slots)
+        if step == steps // 2:
+            store.release(slots[:5]); slots[:5] = [store.acquire() for _ in range(5)]
+    return slots
+
+@pytest.mark.parametrize("tolerance", [0.0, 0.5, 5.0])
+@pytest.mark.parametrize("every", [1, 3])
+@pytest.mark.parametrize("steps", [1, 60, 700])
+def test_gather_matches_reference(tolerance, every, steps):
+    store = TrailStore(span=100, points=32, every=every, tolerance=tolerance, capacity=8)
+    rng = np.random.default_rng(steps); slots = wander(store, rng, steps)
+    # Any order, repeats and empty (-1) slots
+    query = np.concatenate([rng.permutation(slots), [-1], slots[:3], [-1]])
+    points, start = store.gather(query)
+    assert start[0] == 0 and start[-1] == len(points)
+    for k, slot in enumerate(query.tolist()):
+        expected = reference(store, slot)
+        assert np.allclose(points[start[k]:start[k + 1]], expected, atol=1e-3)
+        assert np.allclose(store.get(slot), expected, atol=1e-3)
+
+def test_undecimated_trail_is_the_recent_path():
+    # With no decimation a trail is every recorded position from exactly span steps ago on
+    store = TrailStore(span=50, points=64, tolerance=0.0); slot = store.acquire()
+    path = np.cumsum(np.random.default_rng(0).normal(0, 1, (200, 2)), axis=0)
+    for p in path: store.record(p[None], np.array([slot]))
+    assert np.allclose(store.get(slot), path[-51:], atol=1e-3)
+
+def test_straight_flight_is_cut_at_the_span():
+    # A straight flight merges into its two ends, and the older one is cut back to the position
+    # the body had exactly `span` steps ago
+    store = TrailStore(span=100, points=16, tolerance=0.5); slot = store.acquire()
+    for step in range(1, 301): store.record(np.array([[2.0 * step, -1.0 * step]]), np.array([slot]))
+    assert np.allclose(store.get(slot), [[400.0, -200.0], [600.0, -300.0]], atol=1e-3)